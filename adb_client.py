@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+直接和 adb server(localhost:5037)通信的客户端，省去每条命令启动一个 adb 进程
+协议: https://android.googlesource.com/platform/packages/modules/adb/+/refs/heads/main/docs/dev/services.md
+@date:     2026/10/18
+"""
+import os
+import socket
+import struct
+import threading
+from typing import Optional, Tuple
+
+from comm_tools import get_str
+
+
+class AdbSocketError(Exception):
+    pass
+
+
+class AdbSocketClient(object):
+    HOST = "127.0.0.1"
+    PORT = 5037
+    TIMEOUT = 10
+    # shell: 服务不返回退出码，在命令后追加标记输出 $?
+    EXIT_MARK = b"\x1eAKEXIT:"
+    SYNC_DATA_MAX = 64 * 1024
+
+    def __init__(self, serial: Optional[str] = None, host: str = HOST, port: Optional[int] = None):
+        self._serial = serial
+        self._host = host
+        self._port = port or int(os.environ.get("ANDROID_ADB_SERVER_PORT", self.PORT))
+        # sync 连接可以连续执行多个请求，复用同一个
+        self._sync_lock = threading.Lock()
+        self._sync_sock: Optional[socket.socket] = None
+
+    # ---------------- smart socket ----------------
+
+    def _connect(self) -> socket.socket:
+        sock = socket.create_connection((self._host, self._port), timeout=self.TIMEOUT)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    @staticmethod
+    def _recv_exact(sock: socket.socket, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise AdbSocketError("connection closed by adb server")
+            data += chunk
+        return bytes(data)
+
+    @staticmethod
+    def _recv_all(sock: socket.socket) -> bytes:
+        chunks = []
+        while True:
+            chunk = sock.recv(64 * 1024)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def _request(self, sock: socket.socket, service: str):
+        """
+        请求格式: 4 位十六进制长度 + 服务名，回复 OKAY 或 FAIL + 4 位十六进制长度 + 错误信息
+        """
+        data = service.encode("utf-8")
+        sock.sendall(b"%04x" % len(data) + data)
+        status = self._recv_exact(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            size = int(self._recv_exact(sock, 4), 16)
+            raise AdbSocketError(f"{service}: {get_str(self._recv_exact(sock, size))}")
+        raise AdbSocketError(f"{service}: unexpected status {status!r}")
+
+    def _open_service(self, service: str) -> socket.socket:
+        """
+        连接 adb server，切换到设备后打开服务，之后 socket 就是该服务的数据流
+        """
+        sock = self._connect()
+        try:
+            self._request(sock, f"host:transport:{self._serial}" if self._serial else "host:transport-any")
+            self._request(sock, service)
+        except Exception:
+            sock.close()
+            raise
+        # 超时只用于建立连接，服务的输出可能很久才结束(例如 dumpsys dropbox --print)
+        sock.settimeout(None)
+        return sock
+
+    # ---------------- shell ----------------
+
+    def open_shell(self, cmd: str) -> socket.socket:
+        """
+        打开一个 shell 数据流(例如 logcat)，每个调用方独立的连接，可以同时打开多个
+        """
+        return self._open_service(f"shell:{cmd}")
+
+    def shell(self, cmd: str) -> Tuple[int, bytes]:
+        """
+        :return: (退出码, 输出)
+        """
+        with self.open_shell(f"{cmd}; echo -n '{get_str(self.EXIT_MARK)}'$?") as sock:
+            out = self._recv_all(sock)
+        index = out.rfind(self.EXIT_MARK)
+        if index < 0:
+            raise AdbSocketError(f"shell:{cmd}: exit code not found")
+        code = out[index + len(self.EXIT_MARK):].strip()
+        return int(code) if code.isdigit() else 1, out[:index]
+
+    # ---------------- sync ----------------
+
+    def _sync(self) -> socket.socket:
+        if self._sync_sock is None:
+            self._sync_sock = self._open_service("sync:")
+        return self._sync_sock
+
+    def _close_sync(self):
+        if self._sync_sock is not None:
+            try:
+                self._sync_sock.sendall(b"QUIT" + struct.pack("<I", 0))
+            except OSError:
+                pass
+            self._sync_sock.close()
+            self._sync_sock = None
+
+    def pull(self, remote: str, local: str):
+        """
+        sync 协议: RECV + 路径，回复若干 DATA(<=64K) 后 DONE，出错时 FAIL + 错误信息
+        """
+        with self._sync_lock:
+            path = remote.encode("utf-8")
+            try:
+                sock = self._sync()
+                sock.sendall(b"RECV" + struct.pack("<I", len(path)) + path)
+                with open(local, "wb") as f:
+                    while True:
+                        header = self._recv_exact(sock, 8)
+                        _id, size = header[:4], struct.unpack("<I", header[4:])[0]
+                        if _id == b"DATA":
+                            f.write(self._recv_exact(sock, size))
+                        elif _id == b"DONE":
+                            return
+                        elif _id == b"FAIL":
+                            raise AdbSocketError(f"pull {remote}: {get_str(self._recv_exact(sock, size))}")
+                        else:
+                            raise AdbSocketError(f"pull {remote}: unexpected sync id {_id!r}")
+            except Exception:
+                # 连接状态未知，不再复用
+                self._close_sync()
+                raise
+
+    def close(self):
+        with self._sync_lock:
+            self._close_sync()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+保持一个 `adb shell` 进程，多条短命令依次在其中执行，省去每条命令启动 adb 进程和建立 shell 会话的开销
+每条命令后输出唯一的结束标记和退出码，用来切分输出
+@date:     2026/10/18
+"""
+import asyncio
+import os
+import subprocess
+from typing import List, Optional, Tuple
+
+from async_core import AsyncCore
+
+
+class AdbShellSession(object):
+    TIMEOUT = 30
+
+    def __init__(self, adb: str, serial: Optional[str] = None):
+        self._adb = adb
+        self._serial = serial
+        self._pro: Optional[asyncio.subprocess.Process] = None
+        # asyncio.Lock 按等待顺序唤醒，多个调用方的命令按提交顺序执行
+        self._lock: Optional[asyncio.Lock] = None
+        self._seq = 0
+
+    async def run_async(self, cmd: str, timeout: float = TIMEOUT) -> Tuple[int, bytes]:
+        """
+        可以被多个调用方同时调用
+        :return: (退出码, 输出(包含 stderr))
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                return await asyncio.wait_for(self._execute(cmd), timeout)
+            except BaseException:
+                # 命令卡住或者会话已断开，结束会话，后面的请求会重新打开
+                self._kill()
+                raise
+
+    async def _open(self):
+        cmd: List[str] = [self._adb]
+        if self._serial:
+            cmd += ["-s", self._serial]
+        self._pro = await asyncio.create_subprocess_exec(*cmd, "shell", stdin=subprocess.PIPE,
+                                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                                         limit=AsyncCore.STREAM_LIMIT)
+
+    def _kill(self):
+        pro = self._pro
+        self._pro = None
+        if pro and pro.returncode is None:
+            pro.kill()
+
+    async def _execute(self, cmd: str) -> Tuple[int, bytes]:
+        if self._pro is None or self._pro.returncode is not None:
+            await self._open()
+        self._seq += 1
+        mark = f"__AKLOG_END_{os.getpid()}_{self._seq}__".encode()
+        # stdin 重定向，避免命令读取后面的请求；多输出一个换行保证标记在行首
+        line = f"{{ {cmd} ; }} </dev/null 2>&1; __ak_code=$?; echo; echo {mark.decode()} $__ak_code\n"
+        self._pro.stdin.write(line.encode("utf-8"))
+        await self._pro.stdin.drain()
+        out = bytearray()
+        while True:
+            data = await self._pro.stdout.readline()
+            if not data:
+                raise EOFError(f"adb shell session closed: {cmd}")
+            if data.startswith(mark):
+                code = data[len(mark):].strip()
+                return int(code) if code.isdigit() else 1, bytes(out[:-1])
+            out += data
@@ -5,10 +5,19 @@ see : https://www.cnblogs.com/liuzhipenglove/p/7063808.html
 @author:   wswenyue
 @date:     2022/9/7 
 """
+import asyncio
+import atexit
 import os
 import subprocess
 import shutil
+import threading
+import time
+from typing import List, Union, Optional, Tuple
+import color_print
 import comm_tools
+from adb_client import AdbSocketClient
+from adb_shell_session import AdbShellSession
+from async_core import AsyncCore
 from comm_tools import is_windows_os, is_exe, cmd_run_iter, is_empty, get_str
 
 
@@ -55,11 +64,181 @@ class AdbCmd(object):
         )
 
 
+class AdbConnection(object):
+    """
+    缓存设备连接状态，避免每条命令前都执行一次 `adb devices`
+    检查通过后 TTL 秒内有效；adb 自身出错(不是设备上命令的退出码)时失效；`adb track-devices` 可用时由它实时更新
+    """
+    TTL = 30
+    # adb 自身出错(设备断开、找不到设备等)时 stderr 的前缀，其他非 0 退出码是设备上命令的结果
+    ADB_ERRORS = (b"error:", b"adb: ")
+    _lock = threading.Lock()
+    _valid_until = 0.0
+    _tracking = False
+    _track_started = False
+    # adb track-devices 进程，不结束时会一直运行到下一次设备状态变化
+    _track_pro: Optional[asyncio.subprocess.Process] = None
+
+    @staticmethod
+    def is_valid() -> bool:
+        return time.monotonic() < AdbConnection._valid_until
+
+    @staticmethod
+    def mark_valid():
+        if AdbConnection._tracking:
+            # 状态变化会由 track-devices 通知
+            AdbConnection._valid_until = float("inf")
+        else:
+            AdbConnection._valid_until = time.monotonic() + AdbConnection.TTL
+
+    @staticmethod
+    def invalidate():
+        AdbConnection._valid_until = 0.0
+
+    @staticmethod
+    def check_exit(code: int, err: bytes):
+        """
+        adb 命令结束后调用，设备上的命令失败(例如 grep 没有匹配、ps -p 的进程都已退出)不影响连接状态
+        """
+        if code and (code == 255 or err.lstrip().startswith(AdbConnection.ADB_ERRORS)):
+            AdbConnection.invalidate()
+
+    @staticmethod
+    def start_tracking(adb: str, serial: Optional[str] = None):
+        with AdbConnection._lock:
+            if AdbConnection._track_started:
+                return
+            AdbConnection._track_started = True
+            AdbConnection._tracking = True
+        atexit.register(AdbConnection.stop_tracking)
+        AsyncCore.spawn(AdbConnection._run_tracking(adb, serial))
+
+    @staticmethod
+    def stop_tracking():
+        """
+        进程退出时调用，事件循环线程可能已经不再运行，直接结束子进程
+        """
+        pro = AdbConnection._track_pro
+        AdbConnection._track_pro = None
+        if pro is not None and pro.returncode is None:
+            try:
+                pro.kill()
+            except (ProcessLookupError, RuntimeError):
+                pass
+
+    @staticmethod
+    async def _run_tracking(adb: str, serial: Optional[str]):
+        # 输出格式: 4 位十六进制长度 + "serial\tstate\n..."，每次设备状态变化输出一次
+        pro = None
+        try:
+            pro = await asyncio.create_subprocess_exec(adb, "track-devices", stdout=subprocess.PIPE,
+                                                       stderr=subprocess.DEVNULL)
+            AdbConnection._track_pro = pro
+            while True:
+                size = int(await pro.stdout.readexactly(4), 16)
+                devices = get_str(await pro.stdout.readexactly(size))
+                if any(ls[1:2] == ["device"] and (not serial or ls[0] == serial)
+                       for ls in (line.split() for line in devices.splitlines())):
+                    AdbConnection._valid_until = float("inf")
+                else:
+                    AdbConnection.invalidate()
+        except (asyncio.IncompleteReadError, ValueError, OSError):
+            pass
+        finally:
+            # 任务被取消时也要结束 track-devices
+            AdbConnection._track_pro = None
+            if pro is not None and pro.returncode is None:
+                pro.kill()
+                await pro.wait()
+        # 不支持或者 adb server 退出，回到 TTL
+        AdbConnection._tracking = False
+        AdbConnection.invalidate()
+
+
 class AdbHelper(object):
+    # -s 指定的设备，为空时使用唯一连接的设备
+    _serial: Optional[str] = None
+    # 启用后 shell/pull 命令直接发给 adb server，失败时退回到 adb 命令行
+    _socket_client: Optional[AdbSocketClient] = None
+    # 短命令复用的 adb shell 会话，第一次使用时打开；出错时会话被结束，下一条命令重新打开
+    _shell_session: Optional[AdbShellSession] = None
+    _shell_session_lock = threading.Lock()
+    # 连续失败这么多次后不再使用会话(设备不支持等)，直接使用 adb 命令行
+    SESSION_MAX_FAILURES = 3
+    _shell_session_failures = 0
+    # 连接检查失败时是否重启 adb server(kill-server)，多设备时 server 被其他进程共用，不能重启
+    _restart_server = True
 
     def __init__(self, adb_path=None, open_log=False):
         self._open_log = open_log
         self._adb = AdbCmd.find_adb(adb_path)
+        self._serial = AdbHelper._serial
+
+    @staticmethod
+    def set_serial(serial: Optional[str]):
+        """
+        之后所有 adb 命令都发给该设备(adb -s)，每个进程只对应一个设备
+        """
+        AdbHelper._serial = serial
+
+    @staticmethod
+    def disable_restart_server():
+        AdbHelper._restart_server = False
+
+    @staticmethod
+    def serial() -> Optional[str]:
+        return AdbHelper._serial
+
+    @staticmethod
+    def enable_socket():
+        AdbHelper._socket_client = AdbSocketClient(AdbHelper._serial)
+
+    def _adb_cmd(self) -> List[str]:
+        if self._serial:
+            return [self._adb, "-s", self._serial]
+        return [self._adb]
+
+    def list_devices(self) -> List[str]:
+        """
+        :return: 已连接(状态为 device)的设备
+        """
+        ret = []
+        for line in cmd_run_iter(f"{self._adb} devices"):
+            ls = line.split()
+            if len(ls) == 2 and ls[1] == "device":
+                ret.append(ls[0])
+        return ret
+
+    def is_connected(self) -> bool:
+        """
+        只检查设备当前是否连接，不重启 adb server
+        """
+        devices = self.list_devices()
+        if self._serial:
+            return self._serial in devices
+        return len(devices) > 0
+
+    def _run_socket(self, cmd: str) -> Optional[Tuple[int, bytes, bytes]]:
+        """
+        :return: None 表示不支持或者失败，需要使用 adb 命令行
+        """
+        client = AdbHelper._socket_client
+        if client is None:
+            return None
+        try:
+            if cmd.startswith("shell "):
+                code, out = client.shell(cmd[len("shell "):])
+                return code, out, b""
+            args = cmd.split()
+            if len(args) == 3 and args[0] == "pull":
+                client.pull(args[1], args[2])
+                return 0, b"", b""
+        except Exception as e:
+            color_print.yellow(f"adb server connection error, use adb command instead: {e}")
+            AdbHelper._socket_client = None
+            client.close()
+            AdbConnection.invalidate()
+        return None
 
     def __check_adb_connect(self):
         _cmd = f"{self._adb} devices"
@@ -71,7 +250,7 @@ class AdbHelper(object):
             devices = line.split()
             if len(devices) != 2:
                 raise ValueError(f"run {_cmd} ;; devices result error!!!")
-            if devices[1] == "device":
+            if devices[1] == "device" and (not self._serial or devices[0] == self._serial):
                 return True
         return False
 
@@ -80,21 +259,97 @@ class AdbHelper(object):
         os.system(_cmd)
 
     def check_connect(self):
-        if self.__check_adb_connect():
+        if AdbConnection.is_valid():
             return True
-        self.__restart_adb_connect()
-        if self.__check_adb_connect():
-            return True
-        raise ValueError("adb not connection!!! Please check!!!")
+        with AdbConnection._lock:
+            # 多个线程同时检查时只执行一次
+            if AdbConnection.is_valid():
+                return True
+            if not self.__check_adb_connect():
+                if not AdbHelper._restart_server:
+                    raise ValueError(f"adb device {self._serial} not connection!!! Please check!!!")
+                self.__restart_adb_connect()
+                if not self.__check_adb_connect():
+                    raise ValueError("adb not connection!!! Please check!!!")
+            AdbConnection.mark_valid()
+        AdbConnection.start_tracking(self._adb, self._serial)
+        return True
 
-    def run_cmd_result_code(self, cmd):
-        self.check_connect()
-        _cmd = f"{self._adb} {cmd}"
+    async def _check_connect_async(self):
+        if not AdbConnection.is_valid():
+            await asyncio.to_thread(self.check_connect)
+
+    @staticmethod
+    def _on_session_error(e: BaseException):
+        AdbHelper._shell_session_failures += 1
+        if AdbHelper._shell_session_failures >= AdbHelper.SESSION_MAX_FAILURES:
+            color_print.yellow(f"adb shell session error, use adb command instead: {e}")
+        AdbConnection.invalidate()
+
+    async def _run_session(self, cmd: str) -> Optional[Tuple[int, bytes, bytes]]:
+        """
+        :return: None 表示会话不可用，需要使用 adb 命令行
+        """
+        if AdbHelper._shell_session_failures >= AdbHelper.SESSION_MAX_FAILURES:
+            return None
+        with AdbHelper._shell_session_lock:
+            if AdbHelper._shell_session is None:
+                AdbHelper._shell_session = AdbShellSession(self._adb, self._serial)
+        try:
+            code, out = await AdbHelper._shell_session.run_async(cmd)
+        except asyncio.TimeoutError as e:
+            AdbHelper._on_session_error(e)
+            # 命令本身执行太久，换成 adb 命令行再执行一次也一样
+            raise subprocess.TimeoutExpired(cmd, AdbShellSession.TIMEOUT)
+        except Exception as e:
+            AdbHelper._on_session_error(e)
+            return None
+        AdbHelper._shell_session_failures = 0
+        return code, out, b""
+
+    async def shell_async(self, cmd: str) -> str:
+        """
+        执行短命令(不能是 screenrecord、logcat 这种持续输出的命令)，
+        优先使用 adb server socket 或者复用 adb shell 会话，失败时退回到 adb 命令行
+        """
+        await self._check_connect_async()
+        ret = None
+        if AdbHelper._socket_client:
+            ret = await asyncio.to_thread(self._run_socket, f"shell {cmd}")
+        if ret is None:
+            ret = await self._run_session(cmd)
+        if ret is None:
+            ret = await self.run_cmd_async(f"shell {cmd}")
+        code, out, err = ret
+        if code:
+            if self._open_log:
+                print(f"error: {get_str(err or out)}")
+            raise subprocess.CalledProcessError(code, cmd)
+        return get_str(out)
+
+    def shell(self, cmd: str) -> str:
+        return AsyncCore.run(self.shell_async(cmd))
+
+    async def run_cmd_async(self, cmd, use_socket: bool = True) -> Tuple[int, bytes, bytes]:
+        """
+        :param use_socket: 持续运行、由 Ctrl+C 结束的命令(screenrecord)传 False，
+                           只有 adb 进程收到 SIGINT 后才能结束设备上的命令，通过 socket 执行时无法结束
+        """
+        await self._check_connect_async()
+        if use_socket and AdbHelper._socket_client:
+            ret = await asyncio.to_thread(self._run_socket, cmd)
+            if ret:
+                return ret
+        _cmd = self._adb_cmd() + str(cmd).split()
         if self._open_log:
-            print(f"run {_cmd}")
-        process = subprocess.Popen(str(_cmd).split(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        out, err = process.communicate()
-        return process.returncode, out, err
+            print(f"run {' '.join(_cmd)}")
+        code, out, err = await AsyncCore.exec(_cmd)
+        # adb 自身出错时可能是设备断开，下次执行命令前重新检查
+        AdbConnection.check_exit(code, err)
+        return code, out, err
+
+    def run_cmd_result_code(self, cmd, use_socket: bool = True):
+        return AsyncCore.run(self.run_cmd_async(cmd, use_socket))
 
     def run_cmd(self, cmd) -> str:
         code, out, err = self.run_cmd_result_code(cmd)
@@ -106,19 +361,42 @@ class AdbHelper(object):
 
     def cmd_run_iter(self, cmd):
         self.check_connect()
-        popen = self.popen(cmd, stdout=subprocess.PIPE, universal_newlines=True)
+        ret = self._run_socket(cmd)
+        if ret:
+            code, out, _ = ret
+            for line in get_str(out).splitlines(keepends=True):
+                yield line
+            if code:
+                raise subprocess.CalledProcessError(code, cmd)
+            return
+        popen = self.popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        err: List[str] = []
+        # stderr 单独读取，避免写满管道后阻塞 stdout
+        err_reader = threading.Thread(target=lambda: err.append(popen.stderr.read()), daemon=True)
+        err_reader.start()
         for stdout_line in iter(popen.stdout.readline, ""):
             yield get_str(stdout_line)
         popen.stdout.close()
         return_code = popen.wait()
+        err_reader.join()
         if return_code:
+            err_text = "".join(err)
+            AdbConnection.check_exit(return_code, err_text.encode())
+            if self._open_log:
+                print(f"error: {err_text}")
             raise subprocess.CalledProcessError(return_code, cmd)
 
-    def popen(self, cmd, buf_size=None,
+    def popen(self, cmd: Union[str, List[str]], buf_size=None,
               stdout=None, stderr=None,
               universal_newlines=None) -> subprocess.Popen:
-        _cmd = f"{self._adb} {cmd}"
+        """
+        :param cmd: 字符串按空格拆分参数；参数本身包含空格时传入 list
+        """
+        if isinstance(cmd, str):
+            _cmd = self._adb_cmd() + cmd.split()
+        else:
+            _cmd = self._adb_cmd() + list(cmd)
         if self._open_log:
-            print(f"run {_cmd}")
-        return subprocess.Popen(str(_cmd).split(), bufsize=buf_size, stdout=stdout, stderr=stderr,
+            print(f"run {' '.join(_cmd)}")
+        return subprocess.Popen(_cmd, bufsize=buf_size, stdout=stdout, stderr=stderr,
                                 universal_newlines=universal_newlines)
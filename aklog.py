@@ -2,20 +2,29 @@
 # -*- coding: utf-8 -*-
 # Created by wswenyue on 2018/11/4.
 import argparse
+import functools
+import shlex
+import signal
 import subprocess
-from typing import Optional, List, Dict, Any
+import sys
+from typing import Optional, List, Dict, Any, Callable
 
 import color_print
 import comm_tools
 from adb_utils import AdbHelper
 from app_info import AppInfoHelper
-from comm_tools import get_str
 from content_filter_format import LogPackageFilterFormat, PackageFilterType, LogTagFilterFormat, LogMsgFilterFormat, LogLevelFilterFormat
 from content_format import JsonValueFormat
 from dump_crash_log_tools import DumpCrashLog
+from log_binary_parser import LogBinaryParser
 from log_info import LogLevelHelper
+from log_multi_device import MultiDeviceLog, DeviceLogPrintCtr, DeviceQueueSink
+from log_output import BufferedLogWriter, StreamSink, LogSink
 from log_parser import LogMsgParser
+from log_pipeline import LogPipeline
 from log_print_ctr import LogPrintCtr
+from log_reader import LogStreamReader
+from logcat_pushdown import LogcatPushdown
 from phone_record_video_tools import RecordHelper, PhoneRecordVideo
 from screen_cap_tools import ScreenCapTools
 
@@ -36,14 +45,20 @@ class AkLogArgs(object):
     dest_tag = "tag"
     dest_tag_not = "tag_not"
     dest_tag_not_fuzzy = "tag_not_fuzzy"
-    dest_tag_case = "tag_case"
     dest_tag_exact = "tag_exact"
     dest_msg = "msg"
     dest_msg_not = "msg_not"
     dest_msg_json_value = "msg_json_value"
+    dest_ignore_case = "ignore_case"
+    dest_regex = "regex"
     dest_level = "level"
     dest_cmd_screen_cap = "cmd_screen_cap"
     dest_cmd_record_video = "cmd_record_video"
+    dest_binary = "binary"
+    dest_workers = "workers"
+    dest_adb_socket = "adb_socket"
+    dest_serial = "serial"
+    dest_serial_all = "serial_all"
     # Default values
     def_cmd_screen_cap_path = f"~/Desktop/{ScreenCapTools.DEF_PATH_FILE_NAME}/"
     def_cmd_record_video_path = f"~/Desktop/{PhoneRecordVideo.DEF_PATH_FILE_NAME}/"
@@ -67,10 +82,10 @@ class AkLogArgs(object):
         # top, all, target, exclude
         if args[self.dest_package]:
             return LogPackageFilterFormat(PackageFilterType.TARGET,
-                                          _to_str_arr(args[self.dest_package]))
+                                          _to_str_arr(args[self.dest_package]), **self._parser_args_match(args))
         elif args[self.dest_package_not]:
             return LogPackageFilterFormat(PackageFilterType.EXCLUDE,
-                                          _to_str_arr(args[self.dest_package_not]))
+                                          _to_str_arr(args[self.dest_package_not]), **self._parser_args_match(args))
         elif args[self.dest_package_all]:
             return LogPackageFilterFormat(PackageFilterType.All)
         elif args[self.dest_package_current_top]:
@@ -108,13 +123,16 @@ class AkLogArgs(object):
             tag_not_array = None
         if args[self.dest_tag]:
             return LogTagFilterFormat(target=_to_str_arr(args[self.dest_tag]), tag_not=tag_not_array,
-                                      is_exact=False, is_tag_not_fuzzy=is_tag_not_fuzzy)
+                                      is_exact=False, is_tag_not_fuzzy=is_tag_not_fuzzy,
+                                      **self._parser_args_match(args))
         elif args[self.dest_tag_exact]:
             return LogTagFilterFormat(target=_to_str_arr(args[self.dest_tag_exact]), tag_not=tag_not_array,
-                                      is_exact=True, is_tag_not_fuzzy=is_tag_not_fuzzy)
+                                      is_exact=True, is_tag_not_fuzzy=is_tag_not_fuzzy,
+                                      **self._parser_args_match(args))
         else:
             # Not set, no filtering.
-            return LogTagFilterFormat(tag_not=tag_not_array, is_tag_not_fuzzy=is_tag_not_fuzzy)
+            return LogTagFilterFormat(tag_not=tag_not_array, is_tag_not_fuzzy=is_tag_not_fuzzy,
+                                      **self._parser_args_match(args))
 
     def _define_args_msg(self, args_parser: argparse.ArgumentParser):
         args_parser.add_argument('-mn', '--' + self.dest_msg_not, dest=self.dest_msg_not,
@@ -125,7 +143,7 @@ class AkLogArgs(object):
                               help='Match log content keywords. Supports multiple values, e.g., -m msg1 msg2.',
                               type=str, nargs='+')
         args_msg.add_argument('-mjson', '--' + self.dest_msg_json_value, dest=self.dest_msg_json_value,
-                              help='Match JSON data in log content and extract specified key values. For example, -mjson keyA keyB will match logs with "keyA" or "keyB" in JSON data and extract the corresponding values.',
+                              help='Match JSON data in log content and extract specified key values. For example, -mjson keyA keyB will match logs with "keyA" or "keyB" in JSON data and extract the corresponding values. Use dotted paths such as data.user.id for nested values.',
                               type=str, nargs='+')
 
     def _parser_args_msg(self, args: Dict[str, object]) -> LogMsgFilterFormat:
@@ -140,15 +158,28 @@ class AkLogArgs(object):
                 raise ValueError("Message filter -mjson has empty value!!")
             return LogMsgFilterFormat(
                 msg_not=msg_not_array,
-                json_format=JsonValueFormat(_keys=_array))
+                json_format=JsonValueFormat(_keys=_array),
+                **self._parser_args_match(args))
         elif args[self.dest_msg]:
             _array = _to_str_arr(args[self.dest_msg])
             if comm_tools.is_empty(_array):
                 raise ValueError("Message filter -m has empty value!!")
-            return LogMsgFilterFormat(target=_array, msg_not=msg_not_array)
+            return LogMsgFilterFormat(target=_array, msg_not=msg_not_array, **self._parser_args_match(args))
         else:
             # Not set, no filtering.
-            return LogMsgFilterFormat(msg_not=msg_not_array)
+            return LogMsgFilterFormat(msg_not=msg_not_array, **self._parser_args_match(args))
+
+    # Match mode of the substring filters
+    def _define_args_match(self, args_parser: argparse.ArgumentParser):
+        args_parser.add_argument('-i', '--' + self.dest_ignore_case, dest=self.dest_ignore_case,
+                                 help='Ignore case when matching -p/-pn, -t/-tnf and -m/-mn values. Exact tag filters (-te, -tn) are not affected.',
+                                 action='store_true', default=False)
+        args_parser.add_argument('-r', '--' + self.dest_regex, dest=self.dest_regex,
+                                 help='Treat -p/-pn, -t/-tnf and -m/-mn values as regular expressions; a log matches if any of them is found. Combine with -i to ignore case.',
+                                 action='store_true', default=False)
+
+    def _parser_args_match(self, args: Dict[str, object]) -> Dict[str, bool]:
+        return {"ignore_case": bool(args[self.dest_ignore_case]), "regex": bool(args[self.dest_regex])}
 
     # Log level
     def _define_args_level(self, args_parser: argparse.ArgumentParser):
@@ -166,6 +197,44 @@ class AkLogArgs(object):
         else:
             return LogLevelFilterFormat()
 
+    def _define_args_input(self, args_parser: argparse.ArgumentParser):
+        args_input = args_parser.add_mutually_exclusive_group()
+        args_input.add_argument('-B', '--' + self.dest_binary, dest=self.dest_binary,
+                                help='Read logcat in binary format (logcat -B) and decode entries directly instead of parsing "-v long" text. Faster on busy devices.',
+                                action='store_true', default=False)
+        args_input.add_argument('-w', '--' + self.dest_workers, dest=self.dest_workers,
+                                help='Parse and filter logs in the specified number of worker processes, output order is preserved. Prints throughput stats on exit.',
+                                type=int, default=0)
+        args_parser.add_argument('-as', '--' + self.dest_adb_socket, dest=self.dest_adb_socket,
+                                 help='Send shell/pull commands directly to the adb server (localhost:5037) instead of starting an adb process for each command. Falls back to the adb executable on error.',
+                                 action='store_true', default=False)
+
+    def _define_args_device(self, args_parser: argparse.ArgumentParser):
+        args_device = args_parser.add_mutually_exclusive_group()
+        args_device.add_argument('-s', '--' + self.dest_serial, dest=self.dest_serial,
+                                 help='Use the device(s) with the given serial number(s). Logs from several devices are merged by time with a device column.',
+                                 type=str, nargs='+')
+        args_device.add_argument('-sa', '--' + self.dest_serial_all, dest=self.dest_serial_all,
+                                 help='Show logs from all connected devices, merged by time with a device column.',
+                                 action='store_true', default=False)
+
+    def _parser_serials(self, args: Dict[str, object]) -> List[str]:
+        if args[self.dest_serial]:
+            serials = _to_str_arr(args[self.dest_serial])
+            if len(serials) > 1:
+                # 子进程中不会重启 adb server，启动前检查所有设备都已连接
+                devices = AdbHelper().list_devices()
+                not_connected = [serial for serial in serials if serial not in devices]
+                if not_connected:
+                    raise ValueError(f"adb device {', '.join(not_connected)} not connection!!! Please check!!!")
+            return serials
+        if args[self.dest_serial_all]:
+            serials = AdbHelper().list_devices()
+            if not serials:
+                raise ValueError("adb not connection!!! Please check!!!")
+            return serials
+        return []
+
     def _define_args_cmd(self, args_parser: argparse.ArgumentParser):
         args_cmd = args_parser.add_mutually_exclusive_group()
         args_cmd.add_argument("-cs", "--" + self.dest_cmd_screen_cap, dest=self.dest_cmd_screen_cap,
@@ -204,48 +273,163 @@ class AkLogArgs(object):
         self._define_args_tag(args_parser)
         # Message filtering parameters
         self._define_args_msg(args_parser)
+        # Match mode
+        self._define_args_match(args_parser)
         # Log level
         self._define_args_level(args_parser)
+        # Log input
+        self._define_args_input(args_parser)
+        # Device
+        self._define_args_device(args_parser)
         # Command related
         self._define_args_cmd(args_parser)
         return args_parser
 
-    def _parser_log_args(self, args: Dict[str, object]) -> LogPrintCtr:
-        log_printer = LogPrintCtr()
+    def _parser_log_args(self, args: Dict[str, object], printer_type=LogPrintCtr) -> LogPrintCtr:
+        log_printer = printer_type()
         log_printer.package = self._parser_args_package(args)
         log_printer.tag = self._parser_args_tag(args)
         log_printer.msg = self._parser_args_msg(args)
         log_printer.level = self._parser_args_level(args)
         return log_printer
 
-    def _run_log(self, args_var: Dict[str, object]):
+    def _run_logcat(self, adb: AdbHelper, cmd: List[str], log_printer: LogPrintCtr,
+                    run: Callable[[subprocess.Popen], None], finish: Callable[[bool], None],
+                    quote: bool = False, stderr=None, legacy_cmd: Optional[List[str]] = None):
+        """
+        :param run: 读取并解析 logcat 的输出，直到 logcat 结束
+        :param finish: run 之后调用，处理最后一条还在等待后续内容的日志；
+                       参数为 False 表示 logcat 被重启，这条日志可能不完整，重启后会重新输出，需要丢弃
+        :param quote: exec-out 不会转义参数，需要自己加引号
+        :param legacy_cmd: 设备不支持 cmd 的输出格式时使用的命令
+        """
+        pushdown = LogcatPushdown(log_printer)
+        since = None
+        while True:
+            args = pushdown.build_args(since)
+            if quote:
+                args = [shlex.quote(arg) for arg in args]
+            pro = adb.popen(cmd + args, buf_size=0, stdout=subprocess.PIPE, stderr=stderr)
+            pushdown.watch(pro)
+            run(pro)
+            finish(not pushdown.need_restart())
+            last_log = log_printer.last_log
+            if last_log:
+                # -T 会重复输出 since 这一毫秒内已经处理过的日志，由 log_printer 跳过
+                since = last_log.get_since_time()
+                log_printer.resume_after(last_log)
+            if pushdown.need_restart():
+                # 目标进程变化，从最后一条日志的时间继续
+                continue
+            code = pro.wait()
+            # 设备不支持 shell 协议(Android 7 以下)时退出码总是 0，没有读到任何日志也当作失败
+            if not code and log_printer.last_log is not None:
+                break
+            log_printer.writer.flush()
+            if not adb.is_connected():
+                # 设备断开或者 adb 出错，不是 logcat 不支持参数
+                color_print.red("adb not connection!!! Please check!!!")
+                break
+            # 先去掉过滤参数，仍然失败并且还没有读到日志时再使用旧的输出格式
+            if pushdown.is_enable():
+                color_print.yellow("logcat filter arguments are not supported, filter on host only.")
+                pushdown.disable()
+                continue
+            if legacy_cmd and log_printer.last_log is None:
+                color_print.yellow(f"logcat format is not supported, use: {' '.join(legacy_cmd)}")
+                cmd, legacy_cmd = legacy_cmd, None
+                continue
+            break
+
+    def _run_log_text(self, adb: AdbHelper, log_printer: LogPrintCtr):
+        parser = LogMsgParser(log_printer)
+
+        def _run(pro: subprocess.Popen):
+            for lines in LogStreamReader(pro).iter_lines():
+                parser.parser_lines(lines)
+
+        def _finish(complete: bool):
+            if complete:
+                parser.flush()
+            else:
+                parser.reset()
+
+        self._run_logcat(adb, ["logcat", "-v", LogMsgParser.FORMAT], log_printer, _run, _finish,
+                         stderr=subprocess.STDOUT, legacy_cmd=["logcat", "-v", LogMsgParser.FORMAT_LEGACY])
+
+    def _run_log_pipeline(self, adb: AdbHelper, log_printer: LogPrintCtr, workers: int):
+        pipeline = LogPipeline(log_printer, workers)
+        try:
+            self._run_logcat(adb, ["logcat", "-v", LogMsgParser.FORMAT], log_printer, pipeline.run, pipeline.finish,
+                             stderr=subprocess.STDOUT, legacy_cmd=["logcat", "-v", LogMsgParser.FORMAT_LEGACY])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pipeline.close()
+
+    def _run_log_binary(self, adb: AdbHelper, log_printer: LogPrintCtr):
+        parser = LogBinaryParser(log_printer)
+
+        def _run(pro: subprocess.Popen):
+            for data in LogStreamReader(pro).iter_blocks():
+                try:
+                    parser.feed(data)
+                except Exception as e:
+                    log_printer.print_line(color_print.Colors.RED.format("===========Parser Error==============="))
+                    log_printer.print_line(color_print.Colors.RED.format(str(e)))
+
+        # 不完整的记录无法解析，重启后会重新输出
+        # exec-out: no pty, the binary stream must not be touched by line ending conversion
+        self._run_logcat(adb, ["exec-out", "logcat", "-B"], log_printer, _run, lambda _: parser.reset(), quote=True)
+
+    def _run_log(self, args_var: Dict[str, object], printer_type=LogPrintCtr, sink: Optional[LogSink] = None):
         adb = AdbHelper()
         adb.check_connect()
         AppInfoHelper.start()
-        pro = adb.popen("logcat -v long", buf_size=1, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        err_code = pro.poll()
-        parser = LogMsgParser(self._parser_log_args(args_var))
-        _line = None
-        while err_code is None:
-            try:
-                _line = pro.stdout.readline()
-                if _line:
-                    str_line = get_str(_line).strip()
-                    parser.parser(str_line)
-            except Exception as e:
-                color_print.red(f"===========Parser Error===============\n{e}")
-                if _line:
-                    print(f"==>{_line}<==")
-                # print (">>>>>" + line)
-            err_code = pro.poll()
+        log_printer = self._parser_log_args(args_var, printer_type)
+        log_printer.writer = BufferedLogWriter(sink or StreamSink())
+        try:
+            if args_var[self.dest_binary]:
+                self._run_log_binary(adb, log_printer)
+            elif args_var[self.dest_workers] > 0:
+                self._run_log_pipeline(adb, log_printer, args_var[self.dest_workers])
+            else:
+                self._run_log_text(adb, log_printer)
+        finally:
+            log_printer.writer.close()
+
+    def _run_device_log(self, args_var: Dict[str, object], serial: str, out_queue):
+        """
+        多设备时在子进程中执行，只处理一台设备
+        """
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        # 主进程用 terminate() 结束子进程，转为正常退出，执行退出时的清理(结束 adb track-devices)
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        AdbHelper.set_serial(serial)
+        # adb server 被所有设备共用，一台设备断开时不能 kill-server
+        AdbHelper.disable_restart_server()
+        if args_var[self.dest_adb_socket]:
+            AdbHelper.enable_socket()
+        self._run_log(args_var, DeviceLogPrintCtr, DeviceQueueSink(serial, out_queue))
 
     def run(self, argv: Optional[List] = None):
         args_parser = self._define_args()
         # args_parser.print_help()
         args = args_parser.parse_args(args=argv)
         args_var: dict[str, Any] = vars(args)
+        serials = self._parser_serials(args_var)
+        if len(serials) == 1:
+            AdbHelper.set_serial(serials[0])
+        if args_var[self.dest_adb_socket]:
+            AdbHelper.enable_socket()
         if self._parser_run_cmd(args_var):
             return
+        if len(serials) > 1:
+            if args_var[self.dest_workers] > 0:
+                color_print.yellow("-w is ignored with multiple devices: each device is already parsed in its own process.")
+                args_var[self.dest_workers] = 0
+            MultiDeviceLog(serials, functools.partial(self._run_device_log, args_var)).run()
+            return
         self._run_log(args_var)
 
 
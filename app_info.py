@@ -4,20 +4,65 @@
 @author:   wswenyue
 @date:     2022/11/9 
 """
+import asyncio
+import re
 import threading
 import time
-from typing import Optional
+from typing import Optional, Dict
 
 import comm_tools
 from adb_utils import AdbHelper
-from comm_tools import is_empty, new_thread
+from async_core import AsyncCore
+from comm_tools import is_empty, KeywordMatcher
+from foreground_detector import ForegroundDetector
+from pid_resolver import PidResolver
+
+
+class ProcessInfo(object):
+    """
+    进程表中的一项，发布后不再修改
+    """
+    __slots__ = ("name", "uid", "is_main", "short_name", "show_name")
+
+    def __init__(self, name: str, uid: Optional[int] = None):
+        self.name = name
+        self.uid = uid
+        # com.example.app:push -> 子进程，short_name: app，show_name: app@push
+        self.is_main = ":" not in name
+        self.short_name = name.split(":", 1)[0].split(".")[-1]
+        # 输出时显示的进程名，进程表更新时计算一次
+        if self.is_main:
+            self.show_name = self.short_name + "@main"
+        else:
+            self.show_name = self.short_name + "@" + name.split(":")[1]
 
 
 class AppInfoHelper(object):
+    # 只用于串行化写操作，读取不加锁
     _data_lock = threading.Lock()
-    _main_process = {}
-    _children_process = {}
+    # pid -> ProcessInfo，更新时整体替换(一次引用赋值)，读取方拿到的总是完整的进程表
+    _processes: Dict[int, ProcessInfo] = {}
     _cur_app_package = None
+    # 进程信息或者前台应用变化时加一，用于让依赖这些信息的缓存失效
+    _generation = 0
+    # 进程启动/退出由 logcat 中 ActivityManager 的日志实时更新，ps 只用来定期校准
+    AM_TAG = "ActivityManager"
+    # Start proc 4321:com.example.app/u0a123 for activity {com.example.app/.MainActivity}
+    _PATTERN_START = re.compile(r"^Start proc (\d+):([^\s/]+)/(\S+) for ")
+    # Start proc com.example.app for activity com.example.app/.MainActivity: pid=4321 uid=10123 gids={...}
+    _PATTERN_START_OLD = re.compile(r"^Start proc ([^\s/]+) for .*?: pid=(\d+) uid=(\d+)")
+    # Process com.example.app (pid 4321) has died: fg TOP
+    _PATTERN_DIED = re.compile(r"^Process (\S+) \(pid (\d+)\) has died")
+    _PATTERN_USER = re.compile(r"^u(\d+)_?a(\d+)$")
+    # 间隔(秒)
+    APP_DELAY = 3
+    RECONCILE_DELAY = 15
+    # 能否在日志中看到 ActivityManager 的进程事件(logcat 只输出部分进程时看不到)
+    _process_events = True
+    # 进程表中没有的 pid 按需查询，start() 后生效
+    _resolver: Optional[PidResolver] = None
+    # 前台应用查询，自动选择当前系统上最快的方式
+    _foreground = ForegroundDetector()
 
     @staticmethod
     def cur_app_package():
@@ -26,41 +71,154 @@ class AppInfoHelper(object):
         return comm_tools.get_str(AppInfoHelper._cur_app_package)
 
     @staticmethod
-    def found_name_by_pid(pid: str) -> Optional[str]:
-        if pid in AppInfoHelper._main_process.keys():
-            return AppInfoHelper._main_process[pid]
-        if pid in AppInfoHelper._children_process.keys():
-            return AppInfoHelper._children_process[pid]
-        return None
+    def generation() -> int:
+        return AppInfoHelper._generation
 
     @staticmethod
-    def is_main_process(pid: str) -> Optional[bool]:
-        name = AppInfoHelper.found_name_by_pid(pid)
-        if not name:
-            return None
-        if ":" in name:
+    def _set_cur_app_package(package: Optional[str]):
+        if package != AppInfoHelper._cur_app_package:
+            AppInfoHelper._cur_app_package = package
+            AppInfoHelper._generation += 1
+
+    @staticmethod
+    def found_process_by_pid(pid: int) -> Optional[ProcessInfo]:
+        info = AppInfoHelper._processes.get(pid)
+        if info is None and AppInfoHelper._resolver:
+            AppInfoHelper._resolver.request(pid)
+        return info
+
+    @staticmethod
+    def found_name_by_pid(pid: int) -> Optional[str]:
+        info = AppInfoHelper.found_process_by_pid(pid)
+        return info.name if info else None
+
+    @staticmethod
+    def _on_pid_resolved(pid: int, name: str, user: str) -> bool:
+        if AppInfoHelper._is_ignore_process(user, name):
             return False
+        AppInfoHelper._add_process(pid, name, AppInfoHelper._parser_uid(user))
         return True
 
     @staticmethod
-    def _print():
+    def resolver_stats() -> str:
+        return str(AppInfoHelper._resolver) if AppInfoHelper._resolver else "disabled"
+
+    @staticmethod
+    def foreground_stats() -> str:
+        return str(AppInfoHelper._foreground)
+
+    @staticmethod
+    def found_pids_by_name(matcher: KeywordMatcher) -> Dict[int, Optional[int]]:
+        """
+        查找进程名匹配 matcher 的进程
+        :return: pid -> uid
+        """
+        ret = {}
+        for pid, info in AppInfoHelper._processes.items():
+            if matcher.search(info.name):
+                ret[pid] = info.uid
+        return ret
+
+    @staticmethod
+    def _parser_uid(user: str) -> Optional[int]:
+        # u0_a123(ps) / u0a123(ActivityManager) -> 10123, u10_a5 -> 1010005
+        match = AppInfoHelper._PATTERN_USER.match(user)
+        if not match:
+            return None
+        return int(match.group(1)) * 100000 + 10000 + int(match.group(2))
+
+    @staticmethod
+    def _is_ignore_process(user: str, name: str) -> bool:
+        # 只保留用户 0 的应用进程
+        return (not user.startswith("u0")) or (user[2:3].isdigit()) \
+            or ("/" in name) or ("[" in name) or ("]" in name)
+
+    @staticmethod
+    def _publish(processes: Dict[int, ProcessInfo]):
+        # 调用方持有 _data_lock
+        AppInfoHelper._processes = processes
+        AppInfoHelper._generation += 1
+
+    @staticmethod
+    def _add_process(pid: int, name: str, uid: Optional[int]):
+        with AppInfoHelper._data_lock:
+            processes = dict(AppInfoHelper._processes)
+            processes[pid] = ProcessInfo(name, uid)
+            AppInfoHelper._publish(processes)
+        if AppInfoHelper._resolver:
+            AppInfoHelper._resolver.forget(pid)
+
+    @staticmethod
+    def _remove_process(pid: int):
         with AppInfoHelper._data_lock:
-            print(f"=========main======={AppInfoHelper._cur_app_package}=======")
-            for pid, name in AppInfoHelper._main_process.items():
-                print(f"{pid}\t\t{name}")
-            print("=========main===end===========")
-            print("=========children==============")
-            for pid, name in AppInfoHelper._children_process.items():
-                print(f"{pid}\t\t{name}")
-            print("=========children===end===========")
+            if pid not in AppInfoHelper._processes:
+                return
+            processes = dict(AppInfoHelper._processes)
+            del processes[pid]
+            AppInfoHelper._publish(processes)
+
+    @staticmethod
+    def on_process_event(msg: str) -> bool:
+        """
+        根据 ActivityManager 的进程启动/退出日志更新进程表
+        :return: 是否是进程事件
+        """
+        if msg.startswith("Start proc "):
+            match = AppInfoHelper._PATTERN_START.match(msg)
+            if match:
+                pid, name, user = int(match.group(1)), match.group(2), match.group(3)
+                if not AppInfoHelper._is_ignore_process(user, name):
+                    AppInfoHelper._add_process(pid, name, AppInfoHelper._parser_uid(user))
+                return True
+            match = AppInfoHelper._PATTERN_START_OLD.match(msg)
+            if match:
+                name, pid, uid = match.group(1), int(match.group(2)), int(match.group(3))
+                if uid // 100000 == 0 and uid % 100000 >= 10000:
+                    AppInfoHelper._add_process(pid, name, uid)
+                return True
+            return False
+        if msg.startswith("Process "):
+            match = AppInfoHelper._PATTERN_DIED.match(msg)
+            if match:
+                AppInfoHelper._remove_process(int(match.group(2)))
+                return True
+        return False
+
+    @staticmethod
+    def set_process_events(visible: bool):
+        """
+        logcat 只输出目标进程的日志(--pid/--uid)时，看不到 ActivityManager 的事件，退回到频繁执行 ps
+        """
+        AppInfoHelper._process_events = visible
 
     @staticmethod
-    def _get_parser_process_info():
+    def is_main_process(pid: int) -> Optional[bool]:
+        info = AppInfoHelper.found_process_by_pid(pid)
+        if not info:
+            return None
+        return info.is_main
+
+    @staticmethod
+    def _print():
+        processes = AppInfoHelper._processes
+        print(f"=========main======={AppInfoHelper._cur_app_package}=======")
+        for pid, info in processes.items():
+            if info.is_main:
+                print(f"{pid}\t\t{info.name}")
+        print("=========main===end===========")
+        print("=========children==============")
+        for pid, info in processes.items():
+            if not info.is_main:
+                print(f"{pid}\t\t{info.name}")
+        print("=========children===end===========")
+
+    @staticmethod
+    async def _get_parser_process_info():
         # print(f"=========get_parser_process_info==============")
         try:
             process = {}
             is_skip_title = True
-            for line in AdbHelper().cmd_run_iter("shell ps"):
+            for line in (await AdbHelper().shell_async("ps")).splitlines():
                 if is_skip_title or is_empty(line):
                     is_skip_title = False
                     continue
@@ -71,59 +229,44 @@ class AppInfoHelper(object):
                     # raise ValueError(f"parser Error={len(ls)}=>" + line)
                 # USER      PID   PPID  VSIZE  RSS   WCHAN              PC  NAME
                 user = ls[0]
-                pid = ls[1]
+                pid = int(ls[1])
                 name = ls[-1]
-                if not user.startswith("u0_") \
-                        or ("/" in name) \
-                        or ("[" in name) \
-                        or ("]" in name):
+                if AppInfoHelper._is_ignore_process(user, name):
                     # print("=ignore=>" + line)
                     pass
                 else:
-                    process[pid] = name
+                    process[pid] = (name, AppInfoHelper._parser_uid(user))
 
             with AppInfoHelper._data_lock:
-                AppInfoHelper._children_process.clear()
-                AppInfoHelper._main_process.clear()
-                for pid, name in process.items():
-                    if ":" in name:
-                        # 子进程
-                        AppInfoHelper._children_process[pid] = name
-                    else:
-                        # 主进程
-                        AppInfoHelper._main_process[pid] = name
+                if process == {pid: (info.name, info.uid) for pid, info in AppInfoHelper._processes.items()}:
+                    return
+                AppInfoHelper._publish({pid: ProcessInfo(name, uid) for pid, (name, uid) in process.items()})
         except Exception as e:
             print(f"{e}")
 
     @staticmethod
-    def _get_cur_app_package():
-        try:
-            p = comm_tools.get_str(
-                AdbHelper().run_cmd("shell dumpsys activity top | grep ACTIVITY").split()[-3].split('/')[0])
-            if comm_tools.is_not_empty(p):
-                return p
-        except Exception as e:
-            print(f"get_cur_app_package 1Error==>{e}")
-        try:
-            for line in AdbHelper().cmd_run_iter("shell dumpsys window windows | grep -E 'mFocusedApp'"):
-                line = line.strip()
-                if line.startswith("mFocusedApp="):
-                    AppInfoHelper._cur_app_package = line.split()[4].split("/")[0]
-                    break
-        except Exception as e:
-            print(f"get_cur_app_package Error==>{e}")
+    async def _get_cur_app_package():
+        p = await AppInfoHelper._foreground.detect()
+        if comm_tools.is_not_empty(p):
+            AppInfoHelper._set_cur_app_package(p)
 
     @staticmethod
     def start():
-        new_thread(AppInfoHelper.__run, name="Thread-FetchAPKInfo", args=(3,))
+        AppInfoHelper._resolver = PidResolver(AppInfoHelper._on_pid_resolved)
+        AppInfoHelper._resolver.start()
+        AsyncCore.spawn(AppInfoHelper.__run())
 
     @staticmethod
-    def __run(delay):
+    async def __run():
+        next_reconcile = 0
         while True:
-            AppInfoHelper._get_parser_process_info()
-            AppInfoHelper._get_cur_app_package()
+            now = time.monotonic()
+            if now >= next_reconcile or not AppInfoHelper._process_events:
+                await AppInfoHelper._get_parser_process_info()
+                next_reconcile = now + AppInfoHelper.RECONCILE_DELAY
+            await AppInfoHelper._get_cur_app_package()
             # AppInfoHelper.print()
-            time.sleep(int(delay))
+            await asyncio.sleep(AppInfoHelper.APP_DELAY)
 
 #
 # if __name__ == '__main__':
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+后台 asyncio 事件循环(单独一个线程)，adb/hdc 命令、进程信息轮询等都在这里执行
+同步代码通过 AsyncCore.run() 调用协程
+@date:     2026/10/18
+"""
+import asyncio
+import concurrent.futures
+import subprocess
+import threading
+from typing import Callable, Coroutine, List, Optional, Tuple, TypeVar
+
+from comm_tools import new_thread
+
+T = TypeVar("T")
+
+
+class AsyncCore(object):
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _thread_id: Optional[int] = None
+    _lock = threading.Lock()
+    # asyncio 读取子进程输出时单行的最大长度
+    STREAM_LIMIT = 16 * 1024 * 1024
+
+    @staticmethod
+    def loop() -> asyncio.AbstractEventLoop:
+        with AsyncCore._lock:
+            if AsyncCore._loop is None:
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def _run():
+                    AsyncCore._thread_id = threading.get_ident()
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(started.set)
+                    loop.run_forever()
+
+                new_thread(_run, name="Thread-AsyncCore")
+                started.wait()
+                AsyncCore._loop = loop
+        return AsyncCore._loop
+
+    @staticmethod
+    def run(coro: Coroutine[None, None, T], timeout: Optional[float] = None) -> T:
+        """
+        在其他线程中同步等待协程执行完成，不能在事件循环线程中调用(直接 await)
+        """
+        if threading.get_ident() == AsyncCore._thread_id:
+            coro.close()
+            raise RuntimeError("AsyncCore.run() called from the event loop thread, await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coro, AsyncCore.loop()).result(timeout)
+
+    @staticmethod
+    def spawn(coro: Coroutine) -> concurrent.futures.Future:
+        """
+        后台执行，返回的 Future 可以用来取消
+        """
+        return asyncio.run_coroutine_threadsafe(coro, AsyncCore.loop())
+
+    @staticmethod
+    def call_soon(callback: Callable, *args):
+        AsyncCore.loop().call_soon_threadsafe(callback, *args)
+
+    @staticmethod
+    async def exec(args: List[str], timeout: Optional[float] = None) -> Tuple[int, bytes, bytes]:
+        """
+        执行命令并读取全部输出，超时或者取消时结束子进程
+        :return: (退出码, stdout, stderr)
+        """
+        pro = await asyncio.create_subprocess_exec(*args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            out, err = await asyncio.wait_for(pro.communicate(), timeout)
+        except BaseException:
+            if pro.returncode is None:
+                pro.kill()
+                await pro.wait()
+            raise
+        return pro.returncode, out, err
@@ -0,0 +1,649 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+性能测试脚本，使用生成的(或录制的)logcat数据，不需要连接手机
+eg: python3 benchmark.py ingest -n 200000
+@date:     2026/10/18
+"""
+import argparse
+import io
+import json
+import os
+import random
+import re
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import List, Tuple, Iterator, Optional
+
+from adb_client import AdbSocketClient
+from adb_utils import AdbHelper
+from app_info import AppInfoHelper, ProcessInfo
+from color_print import ColorStrArr, SimpleColorStr, Colors, ColorStr
+from comm_tools import get_str, is_empty, KeywordMatcher
+from log_binary_parser import LogBinaryParser
+from log_info import LogInfo, LogLevelHelper
+from content_format import JsonValueFormat
+from content_filter_format import LogPackageFilterFormat, PackageFilterType, LogTagFilterFormat, \
+    LogMsgFilterFormat, LogLevelFilterFormat
+from log_parser import LogMsgParser
+from log_pipeline import LogPipeline
+from log_print_ctr import LogPrintCtr
+from log_reader import LogStreamReader
+
+_TAGS = ["ActivityManager", "HeadsetStateMachine", "OkHttp", "chromium", "MyTag", "ViewRootImpl", "Zygote"]
+_PIDS = [1785, 2311, 2320, 901, 4001]
+_LEVELS = "VDIWE"
+_PRIORITY = {"V": 2, "D": 3, "I": 4, "W": 5, "E": 6}
+_PROCESS = {1785: "com.android.bluetooth", 2311: "com.example.app", 2320: "com.example.app:push"}
+
+
+class ListPrinter(object):
+    """
+    收集解析结果
+    """
+
+    def __init__(self):
+        self.logs: List[LogInfo] = []
+
+    def print(self, log: LogInfo):
+        self.logs.append(log)
+
+    def print_line(self, line: str):
+        print(line)
+
+
+class CountPrinter(object):
+    """
+    只计数不输出，替代 LogPrintCtr
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def print(self, log: LogInfo):
+        self.count += 1
+
+    def print_line(self, line: str):
+        print(line)
+
+
+class CountLogPrintCtr(LogPrintCtr):
+    """
+    执行完整的过滤，只计数不输出
+    """
+    count = 0
+
+    def output(self, log: LogInfo, p_msg):
+        self.count += 1
+
+
+def new_log_printer(printer_type=CountLogPrintCtr, msg: Optional[List[str]] = None) -> LogPrintCtr:
+    log_printer = printer_type()
+    log_printer.package = LogPackageFilterFormat(PackageFilterType.All)
+    log_printer.tag = LogTagFilterFormat()
+    log_printer.msg = LogMsgFilterFormat(target=msg)
+    log_printer.level = LogLevelFilterFormat()
+    return log_printer
+
+
+def gen_entries(count: int, seed: int = 1) -> Iterator[Tuple[int, int, int, int, str, str, List[str]]]:
+    _random = random.Random(seed)
+    base = 1700000000
+    for i in range(count):
+        pid = _random.choice(_PIDS)
+        tid = pid if _random.random() < 0.6 else pid + _random.randint(1, 50)
+        lines = 1 if _random.random() < 0.9 else _random.randint(2, 8)
+        msg = [f'line {j} of entry {i} {{"code":"{_random.randint(0, 500)}","id":"u{i}"}}' for j in range(lines)]
+        yield base + i // 1000, (i % 1000) * 1000000, pid, tid, _random.choice(_LEVELS), _random.choice(_TAGS), msg
+
+
+def gen_text_capture(count: int, epoch: bool = False) -> bytes:
+    """
+    生成 `logcat -v long` 格式数据
+    :param epoch: `-v long,epoch,uid` 格式
+    """
+    out = []
+    for sec, nsec, pid, tid, level, tag, msg in gen_entries(count):
+        if epoch:
+            out.append("[ %d.%03d %5d:%5d:%5d %s/%-8s ]" % (sec, nsec // 1000000, 10000, pid, tid, level, tag))
+            out.extend(msg)
+            out.append("")
+            continue
+        _time = time.strftime("%m-%d %H:%M:%S", time.localtime(sec))
+        out.append("[ %s.%03d %5d:%5d %s/%-8s ]" % (_time, nsec // 1000000, pid, tid, level, tag))
+        out.extend(msg)
+        out.append("")
+    return ("\n".join(out) + "\n").encode()
+
+
+def gen_binary_capture(count: int) -> bytes:
+    """
+    生成 `logcat -B` 格式数据
+    """
+    out = bytearray()
+    for sec, nsec, pid, tid, level, tag, msg in gen_entries(count):
+        payload = bytes([_PRIORITY[level]]) + tag.encode() + b"\0" + "\n".join(msg).encode() + b"\0"
+        out += struct.pack("<HHiIIIII", len(payload), 28, pid, tid, sec, nsec, 0, 10000) + payload
+    return bytes(out)
+
+
+def _load(path: Optional[str], gen, count: int) -> bytes:
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    return gen(count)
+
+
+def _report(name: str, lines: int, entries: int, cost: float):
+    print(f"{name:<24} {cost:8.3f}s {lines / cost:12.0f} lines/s {entries / cost:12.0f} entries/s")
+
+
+def bench_ingest(args):
+    text = _load(args.text, gen_text_capture, args.count)
+    lines = text.count(b"\n")
+
+    printer = CountPrinter()
+    parser = LogMsgParser(printer)
+    begin = time.perf_counter()
+    for _line in io.BytesIO(text):
+        parser.parser(get_str(_line).strip())
+    _report("text(-v long)", lines, printer.count, time.perf_counter() - begin)
+
+    data = _load(args.binary, gen_binary_capture, args.count)
+    printer = CountPrinter()
+    parser = LogBinaryParser(printer)
+    begin = time.perf_counter()
+    for offset in range(0, len(data), LogStreamReader.BLOCK_SIZE):
+        parser.feed(data[offset:offset + LogStreamReader.BLOCK_SIZE])
+    # 二进制数据没有行的概念，按文本格式的行数折算
+    _report("binary(-B)", lines, printer.count, time.perf_counter() - begin)
+
+
+def _cat_popen(path: str, buf_size: int) -> subprocess.Popen:
+    # 用子进程输出录制数据，模拟 adb logcat 管道
+    _cmd = [sys.executable, "-c", "import shutil,sys;shutil.copyfileobj(open(sys.argv[1],'rb'),sys.stdout.buffer)", path]
+    return subprocess.Popen(_cmd, bufsize=buf_size, stdout=subprocess.PIPE)
+
+
+def bench_reader(args):
+    text = _load(args.text, gen_text_capture, args.count)
+    lines = text.count(b"\n")
+    with tempfile.NamedTemporaryFile(suffix=".log", delete=False) as f:
+        f.write(text)
+    try:
+        printer = CountPrinter()
+        parser = LogMsgParser(printer)
+        begin = time.perf_counter()
+        pro = _cat_popen(f.name, -1)
+        err_code = pro.poll()
+        while err_code is None:
+            _line = pro.stdout.readline()
+            if _line:
+                parser.parser(get_str(_line).strip())
+            err_code = pro.poll()
+        _report("readline()", lines, printer.count, time.perf_counter() - begin)
+
+        printer = CountPrinter()
+        parser = LogMsgParser(printer)
+        begin = time.perf_counter()
+        for _lines in LogStreamReader(_cat_popen(f.name, 0)).iter_lines():
+            parser.parser_lines(_lines)
+        _report("LogStreamReader", lines, printer.count, time.perf_counter() - begin)
+    finally:
+        os.remove(f.name)
+
+
+def bench_pipeline(args):
+    text = _load(args.text, gen_text_capture, args.count)
+    lines = text.count(b"\n")
+    with tempfile.NamedTemporaryFile(suffix=".log", delete=False) as f:
+        f.write(text)
+    try:
+        printer = new_log_printer(msg=["code"])
+        parser = LogMsgParser(printer)
+        begin = time.perf_counter()
+        for _lines in LogStreamReader(_cat_popen(f.name, 0)).iter_lines():
+            parser.parser_lines(_lines)
+        parser.flush()
+        _report("single process", lines, printer.count, time.perf_counter() - begin)
+
+        for workers in args.workers:
+            printer = new_log_printer(msg=["code"])
+            begin = time.perf_counter()
+            pipeline = LogPipeline(printer, workers)
+            pipeline.run(_cat_popen(f.name, 0))
+            pipeline.finish(True)
+            pipeline.close()
+            _report(f"pipeline({workers} workers)", lines, printer.count, time.perf_counter() - begin)
+    finally:
+        os.remove(f.name)
+
+
+def bench_matcher(args):
+    _random = random.Random(2)
+    texts = [msg for *_, msg in gen_entries(args.count)]
+    texts = ["\n".join(msg) for msg in texts]
+    for size in args.terms:
+        terms = ["".join(_random.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(_random.randint(4, 10)))
+                 for _ in range(size)]
+        begin = time.perf_counter()
+        loop_hit = 0
+        for text in texts:
+            for term in terms:
+                if term in text:
+                    loop_hit += 1
+                    break
+        loop_cost = time.perf_counter() - begin
+
+        matcher = KeywordMatcher(terms)
+        begin = time.perf_counter()
+        matcher_hit = 0
+        for text in texts:
+            if matcher.search(text):
+                matcher_hit += 1
+        matcher_cost = time.perf_counter() - begin
+        assert loop_hit == matcher_hit
+        print(f"{size:5d} terms: loop {len(texts) / loop_cost:12.0f}/s; matcher {len(texts) / matcher_cost:12.0f}/s")
+
+
+def _count_hits(texts: List[str], matcher: KeywordMatcher) -> Tuple[int, float]:
+    begin = time.perf_counter()
+    hit = 0
+    for text in texts:
+        if matcher.search(text):
+            hit += 1
+    return hit, time.perf_counter() - begin
+
+
+def bench_case(args):
+    """
+    -i/-r: 每条日志 lower() 后逐个 `in` vs KeywordMatcher(ignore_case) vs re.IGNORECASE 正则(-i -r)
+    """
+    _random = random.Random(3)
+    texts = ["\n".join(msg) for *_, msg in gen_entries(args.count)]
+    for size in args.terms:
+        # 随机大小写，最后一个一定能匹配到一部分日志
+        terms = ["".join(_random.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
+                         for _ in range(_random.randint(4, 10))) for _ in range(size - 1)] + ["Entry 1"]
+        lower_terms = [term.lower() for term in terms]
+        begin = time.perf_counter()
+        lower_hit = 0
+        for text in texts:
+            _text = text.lower()
+            for term in lower_terms:
+                if term in _text:
+                    lower_hit += 1
+                    break
+        lower_cost = time.perf_counter() - begin
+
+        _, substring_cost = _count_hits(texts, KeywordMatcher(terms))
+        ignore_case_hit, ignore_case_cost = _count_hits(texts, KeywordMatcher(terms, ignore_case=True))
+        regex_hit, regex_cost = _count_hits(texts, KeywordMatcher([re.escape(term) for term in terms],
+                                                                  ignore_case=True, regex=True))
+        assert lower_hit == ignore_case_hit == regex_hit, (lower_hit, ignore_case_hit, regex_hit)
+        print(f"{size:5d} terms: substring {len(texts) / substring_cost:10.0f}/s; "
+              f"lower()+in {len(texts) / lower_cost:10.0f}/s; ignore_case {len(texts) / ignore_case_cost:10.0f}/s; "
+              f"IGNORECASE regex {len(texts) / regex_cost:10.0f}/s; hit {ignore_case_hit}/{len(texts)}")
+
+
+def _parse_capture(text: bytes) -> List[LogInfo]:
+    printer = ListPrinter()
+    parser = LogMsgParser(printer)
+    for _lines in text.decode(errors="ignore").split("\n\n"):
+        parser.parser_lines([line.strip() for line in _lines.split("\n")])
+    parser.flush()
+    return printer.logs
+
+
+def bench_filter(args):
+    AppInfoHelper._processes = {pid: ProcessInfo(name) for pid, name in _PROCESS.items()}
+    logs = _parse_capture(_load(args.text, gen_text_capture, args.count))
+    printer = new_log_printer()
+    if args.package:
+        printer.package = LogPackageFilterFormat(PackageFilterType.TARGET, args.package)
+    if args.level:
+        printer.level = LogLevelFilterFormat(LogLevelHelper.level_code(args.level))
+    printer.tag = LogTagFilterFormat(target=args.tag)
+    printer.msg = LogMsgFilterFormat(target=args.msg)
+    begin = time.perf_counter()
+    for log in logs:
+        printer.print(log)
+    cost = time.perf_counter() - begin
+    print(f"LogPrintCtr.print: {len(logs) / cost:12.0f} entries/s; printed {printer.count}/{len(logs)}")
+    print(f"tag cache: {printer.tag.cache}\npid cache: {printer.pid_cache}")
+
+
+_LEGACY_COLORS = {
+    LogLevelHelper.DEBUG: (Colors.Green, Colors.LightGreen),
+    LogLevelHelper.ERROR: (Colors.RED, Colors.LightRed),
+    LogLevelHelper.WARN: (Colors.Yellow, Colors.LightYellow),
+    LogLevelHelper.INFO: (Colors.Blue, Colors.LightBlue),
+    LogLevelHelper.VERBOSE: (Colors.Gray, Colors.LightGray),
+}
+
+
+def _legacy_render(log: LogInfo, p_msg) -> str:
+    """
+    原来每条日志用 ColorStrArr 拼接的方式，用来对比
+    """
+    base_color, tag_color = _LEGACY_COLORS.get(log.get_level(), (Colors.Gray, Colors.LightGray))
+    msg = ColorStrArr(base_color)
+    msg.add(SimpleColorStr("{0} {1} {2} ".format(log.time, log.get_show_name(), log.get_show_tid()), Colors.Gray))
+    level_color = tag_color.copy()
+    level_color.style = "underline"
+    msg.add(ColorStr(f"{log.get_level_name()}", level_color))
+    msg.add(ColorStr(f" {log.tag}: ", tag_color))
+    if isinstance(p_msg, ColorStr):
+        msg.add(p_msg)
+    else:
+        msg.add(ColorStr(p_msg, base_color))
+    return str(msg)
+
+
+def bench_render(args):
+    logs = _parse_capture(_load(args.text, gen_text_capture, args.count))
+    printer = new_log_printer(msg=args.msg)
+    items = []
+    for log in logs:
+        p_msg = printer.filter_msg(log)
+        if p_msg is not None:
+            items.append((log, p_msg))
+    for log, p_msg in items[:1000]:
+        assert _legacy_render(log, p_msg) == printer.render(log, p_msg)
+    begin = time.perf_counter()
+    for log, p_msg in items:
+        _legacy_render(log, p_msg)
+    legacy_cost = time.perf_counter() - begin
+    begin = time.perf_counter()
+    for log, p_msg in items:
+        printer.render(log, p_msg)
+    cost = time.perf_counter() - begin
+    print(f"ColorStrArr: {len(items) / legacy_cost:12.0f} entries/s")
+    print(f"template:    {len(items) / cost:12.0f} entries/s")
+
+
+def bench_adb(args):
+    # 需要连接设备(或者 adb server)
+    adb = AdbHelper()
+    adb.check_connect()
+    for name, enable in (("adb process", False), ("adb server socket", True)):
+        AdbHelper._socket_client = AdbSocketClient() if enable else None
+        costs = []
+        for _ in range(args.count):
+            begin = time.perf_counter()
+            code, out, _ = adb.run_cmd_result_code(f"shell {args.cmd}")
+            costs.append(time.perf_counter() - begin)
+            assert code == 0, out
+        costs.sort()
+        print(f"{name:18s}: avg {sum(costs) / len(costs) * 1000:7.1f}ms; "
+              f"p50 {costs[len(costs) // 2] * 1000:7.1f}ms; max {costs[-1] * 1000:7.1f}ms")
+    AdbHelper._socket_client = None
+
+
+def bench_parser(args):
+    text = _load(args.text, gen_text_capture, args.count)
+    lines = [line.strip() for line in text.decode(errors="ignore").split("\n")]
+    lines = [line for line in lines if line]
+    # `-v long,epoch,uid` 格式，时间戳和 uid 直接解析为数字
+    epoch_lines = [line for line in gen_text_capture(args.count, epoch=True).decode().split("\n") if line]
+
+    def _no_check(_line: str):
+        # 不检查首尾字符，每一行都执行正则
+        match = LogMsgParser.PATTERN_HEAD_EPOCH.fullmatch(_line)
+        if match is not None:
+            return LogMsgParser._build_log_info_epoch(match.groups())
+        match = LogMsgParser.PATTERN_HEAD.search(_line)
+        if match is None:
+            return None
+        return LogMsgParser._build_log_info(match.groups())
+
+    for fmt, _lines in (("long", lines), ("epoch", epoch_lines)):
+        for name, func in (("regex", _no_check), ("parser_head", LogMsgParser.parser_head)):
+            # 差别不大，取 3 次中最快的一次
+            cost = float("inf")
+            for _ in range(3):
+                begin = time.perf_counter()
+                heads = 0
+                for line in _lines:
+                    if func(line):
+                        heads += 1
+                cost = min(cost, time.perf_counter() - begin)
+            _report(f"{name}({fmt})", len(_lines), heads, cost)
+
+
+class _LegacyLogInfo(LogInfo):
+    """
+    原来每行检查、转换后保存，用来对比
+    """
+    __slots__ = ()
+
+    def append_msg_content(self, _content):
+        if is_empty(_content):
+            return
+        if not self._msg:
+            self._msg = []
+        self._msg.append(get_str(_content).strip())
+
+    def get_msg_content(self):
+        if not self._msg:
+            return ""
+        return "\n\t\t".join(self._msg).strip()
+
+
+class _LegacyJsonValueFormat(object):
+    """
+    原来每个 key 一个正则，每个 key 扫描两次(in + findall)，用来对比
+    """
+
+    def __init__(self, _keys: List[str]):
+        self._keys_reg = {}
+        for _key in _keys:
+            self._keys_reg[_key] = re.compile(r'\\?["\']?' + re.escape(_key) + r'\\?["\']?[:=]\\?["\'](.*?)\\?["\']',
+                                              re.M)
+
+    def format_content(self, _input: str) -> Optional[str]:
+        if not any(_key in _input for _key in self._keys_reg.keys()):
+            return None
+        ret = ""
+        for _key, reg in self._keys_reg.items():
+            values = reg.findall(_input)
+            value = "" if not values else str(values[0]).strip() if len(values) == 1 else str(values)
+            if not is_empty(value):
+                ret += f"'{_key}':'{value}'\t"
+        return "👉 " + ret if ret else None
+
+
+def gen_json_message(size: int, seed: int = 3) -> str:
+    """
+    生成大约 size 字节的网络响应日志
+    """
+    _random = random.Random(seed)
+    items = []
+    body = {"code": "0", "msg": "ok", "data": {"user": {"id": "u42", "name": "aklog"}, "items": items}}
+    total = len(json.dumps(body))
+    while total < size:
+        item = {"id": f"i{len(items)}", "title": "t" * _random.randint(5, 40),
+                "price": str(_random.randint(1, 999)), "tags": ["a", "b"]}
+        items.append(item)
+        total += len(json.dumps(item)) + 2
+    return "<-- 200 OK https://example.com/api (12ms) " + json.dumps(body)
+
+
+def bench_json(args):
+    for size in args.sizes:
+        msg = gen_json_message(size * 1024)
+        miss = msg.replace('"', "'").replace("title", "name")
+        for keys in (args.keys, args.keys + ["data.user.id", "data.items.1.price"]):
+            new = JsonValueFormat(keys)
+            old = _LegacyJsonValueFormat(keys)
+            plain = "." not in "".join(keys)
+            if plain:
+                # 普通 key 的结果和原来一致
+                assert new.format_content(msg) == old.format_content(msg)
+                assert new.format_content(miss) == old.format_content(miss)
+            count = max(args.count // size, 1)
+            for name, formatter in (("per-key regex", old), ("one pass", new)):
+                if not plain and formatter is old:
+                    continue
+                begin = time.perf_counter()
+                for _ in range(count):
+                    formatter.format_content(msg)
+                cost = time.perf_counter() - begin
+                label = f"{size}KB {len(keys)} keys {name}"
+                print(f"{label:<32} {cost / count * 1000:9.3f}ms {size * count / 1024 / cost:9.1f}MB/s")
+
+
+def bench_message(args):
+    for size in args.lines:
+        lines = [f"at com.example.app.Foo.method{j}(Foo.java:{j})" for j in range(size)]
+        payload = "\n".join(lines).encode() + b"\0"
+        count = max(args.total // size, 1)
+        total = count * size
+
+        def _run(name: str, func):
+            begin = time.perf_counter()
+            for _ in range(count):
+                func()
+            _report(f"{size} lines {name}", total, count, time.perf_counter() - begin)
+
+        def _legacy_text():
+            log = _LegacyLogInfo(None, None, 1, 1, "D", "tag", 0)
+            for line in lines:
+                log.append_msg_content(line)
+            log.get_msg_content()
+
+        def _text():
+            log = LogInfo(None, None, 1, 1, "D", "tag", 0)
+            for line in lines:
+                log.append_msg_content(line)
+            log.get_msg_content()
+
+        def _legacy_binary():
+            log = _LegacyLogInfo(None, None, 1, 1, "D", "tag", 0)
+            for line in get_str(payload.rstrip(b"\0")).split("\n"):
+                log.append_msg_content(line)
+            log.get_msg_content()
+
+        def _binary():
+            log = LogInfo(None, None, 1, 1, "D", "tag", 0)
+            log.set_msg_bytes(payload)
+            log.get_msg_content()
+
+        def _binary_filtered():
+            # 被 level/tag/包名过滤掉，不需要内容
+            LogInfo(None, None, 1, 1, "D", "tag", 0).set_msg_bytes(payload)
+
+        _run("text old", _legacy_text)
+        _run("text", _text)
+        _run("binary old", _legacy_binary)
+        _run("binary", _binary)
+        _run("binary skip", _binary_filtered)
+
+
+def bench_log_info(args):
+    text = _load(args.text, gen_text_capture, args.count)
+    lines = [line.strip() for line in text.decode(errors="ignore").split("\n")]
+    printer = CountPrinter()
+    parser = LogMsgParser(printer)
+    begin = time.perf_counter()
+    parser.parser_lines(lines)
+    parser.flush()
+    _report("parse", len(lines), printer.count, time.perf_counter() - begin)
+
+    # 过滤和输出时对每条日志的访问
+    logs = _parse_capture(text[:args.access_bytes])
+    begin = time.perf_counter()
+    for log in logs:
+        log.get_level()
+        log.get_level_name()
+        log.get_msg_content()
+        log.get_level()
+        log.get_msg_content()
+    _report("access", 0, len(logs), time.perf_counter() - begin)
+
+    # 保留所有 LogInfo，统计内存
+    sample = lines[:args.memory_lines]
+    printer = ListPrinter()
+    parser = LogMsgParser(printer)
+    tracemalloc.start()
+    parser.parser_lines(sample)
+    parser.flush()
+    for log in printer.logs:
+        log.get_level()
+        log.get_msg_content()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"memory: {size / len(printer.logs):.0f} bytes/entry ({len(printer.logs)} entries)")
+
+
+def main():
+    args_parser = argparse.ArgumentParser(description="AKLog benchmark")
+    sub = args_parser.add_subparsers(dest="name", required=True)
+    ingest = sub.add_parser("ingest", help="text(-v long) vs binary(-B) ingestion")
+    ingest.add_argument("-n", "--count", type=int, default=200000, help="generated entry count")
+    ingest.add_argument("--text", help="recorded `logcat -v long` capture file")
+    ingest.add_argument("--binary", help="recorded `logcat -B` capture file")
+    ingest.set_defaults(func=bench_ingest)
+    reader = sub.add_parser("reader", help="readline() vs block reader on a pipe")
+    reader.add_argument("-n", "--count", type=int, default=200000, help="generated entry count")
+    reader.add_argument("--text", help="recorded `logcat -v long` capture file")
+    reader.set_defaults(func=bench_reader)
+    pipeline = sub.add_parser("pipeline", help="single process vs multi-process pipeline")
+    pipeline.add_argument("-n", "--count", type=int, default=200000, help="generated entry count")
+    pipeline.add_argument("--text", help="recorded `logcat -v long` capture file")
+    pipeline.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts")
+    pipeline.set_defaults(func=bench_pipeline)
+    matcher = sub.add_parser("matcher", help="per-term `in` loop vs KeywordMatcher")
+    matcher.add_argument("-n", "--count", type=int, default=20000, help="generated message count")
+    matcher.add_argument("-t", "--terms", type=int, nargs="+", default=[1, 10, 100, 1000], help="term counts")
+    matcher.set_defaults(func=bench_matcher)
+    case = sub.add_parser("case", help="-i/-r: per-entry lower() loop vs KeywordMatcher vs IGNORECASE regex")
+    case.add_argument("-n", "--count", type=int, default=100000, help="generated message count")
+    case.add_argument("-t", "--terms", type=int, nargs="+", default=[1, 4, 16, 100], help="term counts")
+    case.set_defaults(func=bench_case)
+    _filter = sub.add_parser("filter", help="LogPrintCtr filtering (output is only counted)")
+    _filter.add_argument("-n", "--count", type=int, default=200000, help="generated entry count")
+    _filter.add_argument("--text", help="recorded `logcat -v long` capture file")
+    _filter.add_argument("-p", "--package", nargs="+")
+    _filter.add_argument("-l", "--level")
+    _filter.add_argument("-t", "--tag", nargs="+")
+    _filter.add_argument("-m", "--msg", nargs="+")
+    _filter.set_defaults(func=bench_filter)
+    render = sub.add_parser("render", help="ColorStrArr assembly vs precomputed level templates")
+    render.add_argument("-n", "--count", type=int, default=200000, help="generated entry count")
+    render.add_argument("--text", help="recorded `logcat -v long` capture file")
+    render.add_argument("-m", "--msg", nargs="+", help="highlight keywords (ColorStr message path)")
+    render.set_defaults(func=bench_render)
+    adb = sub.add_parser("adb", help="per-command latency: adb process vs adb server socket")
+    adb.add_argument("-n", "--count", type=int, default=50, help="command count")
+    adb.add_argument("--cmd", default="echo 1", help="shell command")
+    adb.set_defaults(func=bench_adb)
+    parser = sub.add_parser("parser", help="log head regex vs fast path (checks the results are the same)")
+    parser.add_argument("-n", "--count", type=int, default=500000, help="generated entry count")
+    parser.add_argument("--text", help="recorded `logcat -v long` capture file")
+    parser.set_defaults(func=bench_parser)
+    _json = sub.add_parser("json", help="-mjson: regex per key vs one pass (and dotted paths)")
+    _json.add_argument("--sizes", type=int, nargs="+", default=[1, 16, 256, 1024], help="message sizes (KB)")
+    _json.add_argument("-k", "--keys", nargs="+", default=["code", "id", "name", "price", "token"])
+    _json.add_argument("-n", "--count", type=int, default=2048, help="KB formatted per case")
+    _json.set_defaults(func=bench_json)
+    message = sub.add_parser("message", help="multi-line message accumulation: per-line checks vs lazy join")
+    message.add_argument("--lines", type=int, nargs="+", default=[1, 50, 2000], help="lines per entry")
+    message.add_argument("--total", type=int, default=400000, help="total lines per case")
+    message.set_defaults(func=bench_message)
+    log_info = sub.add_parser("loginfo", help="LogInfo parse throughput and memory per entry")
+    log_info.add_argument("-n", "--count", type=int, default=1000000, help="generated entry count")
+    log_info.add_argument("--text", help="recorded `logcat -v long` capture file")
+    log_info.add_argument("--memory_lines", type=int, default=300000, help="lines used to measure memory")
+    log_info.add_argument("--access_bytes", type=int, default=32 * 1024 * 1024, help="capture bytes used to measure access")
+    log_info.set_defaults(func=bench_log_info)
+    args = args_parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
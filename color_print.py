@@ -8,6 +8,7 @@ import comm_tools
 
 
 class AsciiColor(object):
+    RESET = u'\u001b[0m'
     fg_desc = {
         "black": 30, "red": 31, "green": 32, "yellow": 33, "blue": 34,
         "purple": 35, "cyan": 36, "white": 37, "gray": 37,
@@ -72,7 +73,7 @@ class AsciiColor(object):
         return ''
 
     def format(self, data: str) -> str:
-        return str(self) + data + u'\u001b[0m'
+        return str(self) + data + self.RESET
 
     @property
     def style(self) -> int:
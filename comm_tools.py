@@ -5,12 +5,14 @@ import errno
 import fnmatch
 import os
 import platform
+import re
 import shutil
 import subprocess
 import sys
 
 import threading
-from typing import Tuple, Iterable, List, Optional
+from collections import OrderedDict
+from typing import Tuple, Iterable, List, Optional, Any, Hashable
 
 
 def is_empty(obj):
@@ -174,6 +176,126 @@ def match_str(a: str, b: str, is_exact: bool = True, is_ignore_case: bool = Fals
             return a in b
 
 
+def _build_keywords_trie(keywords: Iterable[str]) -> dict:
+    """
+    构建关键字前缀树，None 表示关键字结束
+    某个关键字是另一个的前缀时只保留短的(只需要判断是否包含)
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        last = len(keyword) - 1
+        for index, char in enumerate(keyword):
+            if char in node and node[char] is None:
+                break
+            if index == last:
+                node[char] = None
+            else:
+                node = node.setdefault(char, {})
+    return trie
+
+
+def _build_trie_regex(node: Optional[dict]) -> str:
+    parts = []
+    while node is not None and len(node) == 1:
+        char, node = next(iter(node.items()))
+        parts.append(re.escape(char))
+    if node:
+        parts.append("(?:" + "|".join(re.escape(char) + _build_trie_regex(child) for char, child in node.items()) + ")")
+    return "".join(parts)
+
+
+class KeywordMatcher(object):
+    """
+    判断文本是否包含任一关键字，与逐个 `in` 判断结果一致
+    关键字较多时编译成一个正则(前缀树结构)，一次扫描完成；较少时逐个 `in` 更快
+    忽略大小写时关键字在创建时转成小写，匹配时只 lower() 文本(比 re.IGNORECASE 快很多)；
+    正则模式在创建时编译成一个正则，忽略大小写时用 re.IGNORECASE
+    """
+    LOOP_MAX_SIZE = 16
+
+    def __init__(self, keywords: List[str], ignore_case: bool = False, regex: bool = False):
+        """
+        :param ignore_case: 忽略大小写
+        :param regex: 关键字是正则表达式，文本中有任一匹配即可
+        """
+        self.keywords = keywords
+        self._keywords: Optional[Tuple[str, ...]] = None
+        self._pattern = None
+        self._lower = ignore_case and not regex
+        self._all = "" in keywords
+        if self._all or len(keywords) <= 0:
+            return
+        if regex:
+            try:
+                self._pattern = re.compile("|".join(f"(?:{keyword})" for keyword in keywords),
+                                           re.IGNORECASE if ignore_case else 0)
+            except re.error as e:
+                raise ValueError(f"Invalid regex {keywords}: {e}")
+            return
+        if self._lower:
+            keywords = [keyword.lower() for keyword in keywords]
+        if len(keywords) <= self.LOOP_MAX_SIZE:
+            self._keywords = tuple(keywords)
+            return
+        try:
+            regex = _build_trie_regex(_build_keywords_trie(keywords))
+        except RecursionError:
+            regex = "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+        self._pattern = re.compile(regex)
+
+    def search(self, text: str) -> bool:
+        if self._lower:
+            text = text.lower()
+        if self._keywords is not None:
+            for keyword in self._keywords:
+                if keyword in text:
+                    return True
+            return False
+        if self._pattern is not None:
+            return self._pattern.search(text) is not None
+        return self._all
+
+
+class LruCache(object):
+    """
+    容量有限的 LRU 缓存，记录命中/未命中次数
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __str__(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0
+        return f"hits:{self.hits} misses:{self.misses} hit_rate:{rate:.1%} size:{len(self)}/{self.max_size}"
+
+
 def read_file_line_iter(file_path):
     with open(file_path) as fp:
         if not fp:
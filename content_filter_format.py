@@ -8,9 +8,9 @@ from abc import ABCMeta, abstractmethod
 from enum import Enum
 from typing import Optional, List, Union
 
-import comm_tools
 from app_info import AppInfoHelper
 from color_print import ColorStr
+from comm_tools import KeywordMatcher, LruCache
 from content_format import JsonValueFormat
 from log_info import LogLevelHelper
 
@@ -50,9 +50,11 @@ class LogPackageFilterFormat(IBaseFilterFormat):
     log package 过滤
     """
 
-    def __init__(self, _type: PackageFilterType, _target: Optional[List[str]] = None):
+    def __init__(self, _type: PackageFilterType, _target: Optional[List[str]] = None,
+                 ignore_case: bool = False, regex: bool = False):
         self.type = _type
         self.target_package = _target
+        self.target_matcher = KeywordMatcher(_target, ignore_case, regex) if _target else None
 
     def filter(self, package: str) -> bool:
         if self.type == PackageFilterType.Top:
@@ -60,79 +62,91 @@ class LogPackageFilterFormat(IBaseFilterFormat):
         elif self.type == PackageFilterType.All:
             return True
         elif self.type == PackageFilterType.TARGET:
-            if comm_tools.is_empty(self.target_package):
+            if not self.target_matcher:
                 return False
-            for _target in self.target_package:
-                if _target in package:
-                    return True
-            return False
+            return self.target_matcher.search(package)
         elif self.type == PackageFilterType.EXCLUDE:
-            if comm_tools.is_empty(self.target_package):
+            if not self.target_matcher:
                 return True
-            for _target in self.target_package:
-                if _target in package:
-                    return False
-            return True
+            return not self.target_matcher.search(package)
         else:
             # 没有类型，默认当做all处理
             return True
 
 
 class LogTagFilterFormat(IBaseFilterFormat):
+    CACHE_SIZE = 4096
 
     def __init__(self, target: Optional[List[str]] = None,
                  tag_not: Optional[List[str]] = None,
                  is_exact: bool = False,
-                 is_tag_not_fuzzy: bool = False):
+                 is_tag_not_fuzzy: bool = False,
+                 ignore_case: bool = False,
+                 regex: bool = False):
+        """
+        :param ignore_case: 模糊匹配(target、is_tag_not_fuzzy 的 tag_not)忽略大小写，精确匹配不受影响
+        :param regex: 模糊匹配的值是正则表达式
+        """
         self.is_exact = is_exact
         self.target = target
         self.tag_not = tag_not
         self.is_tag_not_fuzzy = is_tag_not_fuzzy
+        # 过滤条件在创建时编译好：精确匹配用 set，模糊匹配用 KeywordMatcher
+        self._tag_not_set = frozenset(tag_not) if tag_not and not is_tag_not_fuzzy else None
+        self._tag_not_matcher = KeywordMatcher(tag_not, ignore_case, regex) if tag_not and is_tag_not_fuzzy else None
+        self._target_set = frozenset(target) if target and is_exact else None
+        self._target_matcher = KeywordMatcher(target, ignore_case, regex) if target and not is_exact else None
+        # 没有任何 tag 过滤条件
+        self.is_accept_all = not (tag_not or target)
+        # 结果只和 tag 有关，缓存起来
+        self.cache = LruCache(self.CACHE_SIZE)
 
     def filter(self, tag: str) -> bool:
-        if self.tag_not:
-            if self.is_tag_not_fuzzy:
-                for tagN in self.tag_not:
-                    if tagN in tag:
-                        return False
-            else:
-                if tag.strip() in self.tag_not:
-                    return False
-        if (self.target is None) or (len(self.target) <= 0):
-            # 没有设置tag，既不需要匹配tag，全接受
-            return True
-        if self.is_exact:
-            return tag in self.target
-        else:
-            for _tag in self.target:
-                if _tag in tag:
-                    return True
-            return False
+        verdict = self.cache.get(tag)
+        if verdict is None:
+            verdict = self._filter(tag)
+            self.cache.put(tag, verdict)
+        return verdict
+
+    def _filter(self, tag: str) -> bool:
+        if self._tag_not_matcher:
+            if self._tag_not_matcher.search(tag):
+                return False
+        elif self._tag_not_set:
+            if tag.strip() in self._tag_not_set:
+                return False
+        if self._target_set:
+            return tag.strip() in self._target_set
+        if self._target_matcher:
+            return self._target_matcher.search(tag)
+        # 没有设置tag，既不需要匹配tag，全接受
+        return True
 
 
 class LogMsgFilterFormat(IBaseFilterFormat):
     def __init__(self, target: Optional[List[str]] = None,
                  msg_not: Optional[List[str]] = None,
-                 json_format: Optional[JsonValueFormat] = None):
+                 json_format: Optional[JsonValueFormat] = None,
+                 ignore_case: bool = False,
+                 regex: bool = False):
         self.target = target
         self.msg_not = msg_not
         self.json_format = json_format
+        self._target_matcher = KeywordMatcher(target, ignore_case, regex) if target else None
+        self._msg_not_matcher = KeywordMatcher(msg_not, ignore_case, regex) if msg_not else None
 
     def filter(self, msg: str) -> bool:
         # 不处理
         return True
 
     def format_content(self, _input: str) -> Optional[Union[str, ColorStr]]:
-        if self.msg_not:
-            for msgN in self.msg_not:
-                if msgN in _input:
-                    return None
+        if self._msg_not_matcher and self._msg_not_matcher.search(_input):
+            return None
         if self.json_format:
             return self.json_format.format_content(_input)
-        if comm_tools.is_not_empty(self.target):
-            for _msg in self.target:
-                if _msg in _input:
-                    return _input
+        if self._target_matcher:
+            if self._target_matcher.search(_input):
+                return _input
             return None
         return _input
 
@@ -142,6 +156,9 @@ class LogLevelFilterFormat(IBaseFilterFormat):
         self.target = target
 
     def filter(self, level: str) -> bool:
+        return self.filter_code(LogLevelHelper.level_code(level))
+
+    def filter_code(self, level: int) -> bool:
         if self.target:
-            return self.target <= LogLevelHelper.level_code(level)
+            return self.target <= level
         return True
@@ -4,12 +4,14 @@
 @author:   wswenyue
 @date:     2022/11/18 
 """
+import json
 import re
 from abc import ABCMeta, abstractmethod
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 
 import comm_tools
 from color_print import ColorStr
+from comm_tools import KeywordMatcher
 
 
 class IFormatContent(metaclass=ABCMeta):
@@ -20,36 +22,99 @@ class IFormatContent(metaclass=ABCMeta):
 
 
 class JsonValueFormat(IFormatContent):
+    """
+    提取日志中 JSON 数据的字段值:
+    key: 一个正则匹配所有 key("key":"value" 或 key='value'，可以是转义后的 JSON)，一次扫描，结果和每个 key 单独匹配相同
+    a.b.c: 按路径在解析后的 JSON 中查找，值是字符串形式的 JSON 时继续解析，数组可以用下标(items.0.id)
+    """
+    # 一条日志中最多尝试解析的 JSON 起始位置(日志被截断时可能有很多解析失败的 "{")
+    MAX_DECODE = 64
+    _DECODER = json.JSONDecoder()
+    _PATTERN_DOC = re.compile(r"[{\[]")
+
     def __init__(self, _keys: List[str]):
-        self._keys_reg = {}
-        for _key in _keys:
-            self._keys_reg[_key] = re.compile(r'\\?["\']?' + re.escape(_key) + r'\\?["\']?[:=]\\?["\'](.*?)\\?["\']',
-                                              re.M)
+        # 去重并保持顺序
+        self._keys = list(dict.fromkeys(_keys))
+        keys = [_key for _key in self._keys if "." not in _key.strip(".")]
+        self._paths = {_key: _key.split(".") for _key in self._keys if _key not in keys}
+        self._keys_reg = None
+        if keys:
+            # 长的 key 在前，避免只匹配到前缀；放在前瞻中，每个位置都会尝试，
+            # 一个 key 包含另一个 key(id 和 user_id)时两个都能匹配到，和每个 key 单独匹配的结果相同
+            alternation = "|".join(re.escape(_key) for _key in sorted(keys, key=len, reverse=True))
+            self._keys_reg = re.compile(r'(?=(' + alternation + r')\\?["\']?[:=]\\?["\'](.*?)(\\?["\']))')
+        # 包含 key(路径的最后一段)才需要提取
+        self._matcher = KeywordMatcher(keys + [path[-1] for path in self._paths.values()])
+
+    def _match_keys(self, msg: str, ret: Dict[str, str]):
+        values: Dict[str, List[str]] = {}
+        # 每个 key 上一次匹配的结束位置，同一个 key 的匹配不重叠(和 findall 相同)
+        ends: Dict[str, int] = {}
+        for match in self._keys_reg.finditer(msg):
+            _key = match.group(1)
+            if match.start() < ends.get(_key, 0):
+                continue
+            ends[_key] = match.end(3)
+            values.setdefault(_key, []).append(match.group(2))
+        for _key, value in values.items():
+            ret[_key] = value[0].strip() if len(value) == 1 else str(value)
 
     @staticmethod
-    def _reg_match(reg, msg: str) -> str:
-        ret = reg.findall(msg)
-        if comm_tools.is_empty(ret):
-            return ""
-        if len(ret) == 1:
-            return str(ret[0]).strip()
-        return str(ret)
+    def _walk(obj, path: List[str]):
+        for part in path:
+            if isinstance(obj, str) and obj[:1] in ("{", "["):
+                try:
+                    obj = json.loads(obj)
+                except ValueError:
+                    return None
+            if isinstance(obj, dict):
+                obj = obj.get(part)
+            elif isinstance(obj, list) and part.isdigit() and int(part) < len(obj):
+                obj = obj[int(part)]
+            else:
+                return None
+        return obj
+
+    def _match_paths(self, msg: str, ret: Dict[str, str]):
+        pending = {_key: path for _key, path in self._paths.items() if path[-1] in msg}
+        decode = 0
+        match = self._PATTERN_DOC.search(msg)
+        while pending and match and decode < self.MAX_DECODE:
+            decode += 1
+            try:
+                obj, end = self._DECODER.raw_decode(msg, match.start())
+            except ValueError:
+                match = self._PATTERN_DOC.search(msg, match.end())
+                continue
+            for _key, path in list(pending.items()):
+                value = self._walk(obj, path)
+                if value is None:
+                    continue
+                del pending[_key]
+                if isinstance(value, str):
+                    ret[_key] = value.strip()
+                else:
+                    ret[_key] = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+            match = self._PATTERN_DOC.search(msg, end)
+        if pending and '\\"' in msg:
+            # 整段是转义后的 JSON，例如 body={\"data\":{...}}
+            self._match_paths(msg.replace('\\"', '"'), ret)
 
     def format_content(self, _input: str) -> Optional[Union[str, ColorStr]]:
         if comm_tools.is_empty(_input):
             return None
-        has_key = False
-        for _key in self._keys_reg.keys():
-            if _key in _input:
-                has_key = True
-                break
-        if not has_key:
+        if not self._matcher.search(_input):
             return None
+        values: Dict[str, str] = {}
+        if self._keys_reg:
+            self._match_keys(_input, values)
+        if self._paths:
+            self._match_paths(_input, values)
         ret: str = ""
-        for _key, reg in self._keys_reg.items():
-            value = JsonValueFormat._reg_match(reg, _input)
+        for _key in self._keys:
+            value = values.get(_key)
             if comm_tools.is_not_empty(value):
                 ret += f"'{_key}':'{value}'\t"
-        if comm_tools.is_empty(ret):
+        if not ret:
             return None
         return "👉 " + ret
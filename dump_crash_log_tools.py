@@ -40,7 +40,7 @@ class DumpCrashLog(object):
 
     def do_work(self):
         time_list = []
-        for line in AdbHelper().cmd_run_iter("shell dumpsys dropbox"):
+        for line in AdbHelper().shell("dumpsys dropbox").splitlines():
             if comm_tools.is_empty(line):
                 continue
             if self.filter_tag not in line:
@@ -59,6 +59,7 @@ class DumpCrashLog(object):
         buf.write(tip_begin)
         print(tip_begin)
         for index, t in enumerate(reversed(time_list)):
+            # 输出可能很大、很慢，不使用 shell 会话(有超时)
             out = AdbHelper().run_cmd(f"shell dumpsys dropbox --print '{t}'")
             buf.write(out)
             buf.write(tip_newline)
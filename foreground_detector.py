@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+查询前台应用包名: 有多个查询方式，不同系统版本支持的不一样，开销也差别很大
+(`dumpsys activity top` 会输出前台界面的整个 View 树)
+第一次查询时依次试一遍轻量的方式，记录耗时，之后优先使用最快的可用方式，连续失败再换下一个
+@date:     2026/10/18
+"""
+import re
+import time
+from typing import Callable, List, Optional
+
+from adb_utils import AdbHelper
+
+# ActivityRecord{1a2b u0 com.example.app/.MainActivity t12}
+_PATTERN_RESUMED = re.compile(r"(?:mResumedActivity|topResumedActivity|ResumedActivity)[:=]\s*"
+                              r"ActivityRecord\{\S+ u\d+ ([^\s/]+)/")
+# mCurrentFocus=Window{3c4d u0 com.example.app/com.example.app.MainActivity}，锁屏等系统窗口没有 "/"
+_PATTERN_FOCUS = re.compile(r"mCurrentFocus=Window\{\S+ u\d+ ([^\s/}]+)/")
+# taskId=12: com.example.app/.MainActivity bounds=[0,0][1080,2340] userId=0 visible=true ...
+_PATTERN_STACK = re.compile(r"taskId=\d+: ([^\s/]+)/\S+ .*visible=true")
+
+
+def _parser_resumed(out: str) -> Optional[str]:
+    m = _PATTERN_RESUMED.search(out)
+    return m.group(1) if m else None
+
+
+def _parser_focus(out: str) -> Optional[str]:
+    m = _PATTERN_FOCUS.search(out)
+    return m.group(1) if m else None
+
+
+def _parser_stack(out: str) -> Optional[str]:
+    # 按从上到下的顺序输出，第一个可见的任务就是前台
+    m = _PATTERN_STACK.search(out)
+    return m.group(1) if m else None
+
+
+def _parser_activity_top(out: str) -> Optional[str]:
+    # ACTIVITY com.example.app/.MainActivity 1234 pid=2311
+    ls = out.split()
+    return ls[-3].split("/")[0] if len(ls) >= 3 else None
+
+
+def _parser_focused_app(out: str) -> Optional[str]:
+    for line in out.splitlines():
+        line = line.strip()
+        if line.startswith("mFocusedApp="):
+            ls = line.split()
+            return ls[4].split("/")[0] if len(ls) > 4 else None
+    return None
+
+
+class _Source(object):
+    # 耗时的平滑系数
+    ALPHA = 0.3
+
+    def __init__(self, name: str, cmd: str, parser: Callable[[str], Optional[str]], fallback: bool = False):
+        """
+        :param fallback: 开销大的方式，只在轻量的方式都不可用时使用
+        """
+        self.name = name
+        self.cmd = cmd
+        self.parser = parser
+        self.fallback = fallback
+        # 平均耗时(秒)，None 表示还没有执行过
+        self.cost: Optional[float] = None
+        self.failures = 0
+        self.hits = 0
+        # 连续失败暂停使用后，到这个时间(monotonic)再重新尝试
+        self.retry_at = 0.0
+
+    def update(self, cost: float, ok: bool):
+        self.cost = cost if self.cost is None else self.cost + (cost - self.cost) * self.ALPHA
+        if ok:
+            self.hits += 1
+            self.failures = 0
+        else:
+            self.failures += 1
+            if self.failures >= ForegroundDetector.MAX_FAILURES:
+                self.retry_at = time.monotonic() + ForegroundDetector.RETRY_DELAY
+
+    def __str__(self):
+        cost = "-" if self.cost is None else f"{self.cost * 1000:.0f}ms"
+        return f"{self.name}({cost} hits:{self.hits})"
+
+
+class ForegroundDetector(object):
+    # 连续失败次数达到后暂停使用 RETRY_DELAY 秒(锁屏时轻量的方式也会失败)，所有方式都不可用时重新全部尝试
+    MAX_FAILURES = 3
+    RETRY_DELAY = 60
+
+    def __init__(self):
+        self._sources: List[_Source] = [
+            _Source("activities", "dumpsys activity activities | grep -E 'mResumedActivity|topResumedActivity'",
+                    _parser_resumed),
+            _Source("window", "dumpsys window displays | grep -E 'mCurrentFocus'", _parser_focus),
+            _Source("stack", "am stack list", _parser_stack),
+            _Source("activity_top", "dumpsys activity top | grep ACTIVITY", _parser_activity_top, fallback=True),
+            _Source("focused_app", "dumpsys window windows | grep -E 'mFocusedApp'", _parser_focused_app,
+                    fallback=True),
+        ]
+        self._probed = False
+
+    def _usable(self) -> List[_Source]:
+        now = time.monotonic()
+        sources = [s for s in self._sources if s.failures < self.MAX_FAILURES or now >= s.retry_at]
+        if not sources:
+            for s in self._sources:
+                s.failures = 0
+            sources = self._sources
+        return sources
+
+    def _ordered(self) -> List[_Source]:
+        """
+        轻量的方式在前，同一类中最近成功的按耗时排序，最近失败的和没有执行过的排在后面
+        """
+        return sorted(self._usable(), key=lambda s: (s.fallback, s.failures > 0, s.cost is None, s.cost or 0))
+
+    @staticmethod
+    async def _run(source: _Source) -> Optional[str]:
+        begin = time.perf_counter()
+        try:
+            # grep 没有匹配时退出码为 1，不当作错误(会触发重新检查设备连接)
+            p = source.parser(await AdbHelper().shell_async(f"{source.cmd} || true"))
+        except Exception as e:
+            print(f"get_cur_app_package {source.name} Error==>{e}")
+            p = None
+        source.update(time.perf_counter() - begin, bool(p))
+        return p or None
+
+    async def _probe(self) -> Optional[str]:
+        """
+        轻量的方式都执行一次记录耗时，返回最快的一个的结果
+        """
+        self._probed = True
+        ret = None
+        best = None
+        for source in self._sources:
+            if source.fallback:
+                continue
+            p = await self._run(source)
+            if p and (best is None or source.cost < best.cost):
+                ret, best = p, source
+        return ret
+
+    async def detect(self) -> Optional[str]:
+        """
+        :return: 前台应用包名，所有方式都失败(例如锁屏)时返回 None
+        """
+        sources = self._ordered()
+        if not self._probed:
+            p = await self._probe()
+            if p:
+                return p
+            sources = [s for s in sources if s.fallback]
+        for source in sources:
+            p = await self._run(source)
+            if p:
+                return p
+            if source.hits and source.failures < self.MAX_FAILURES:
+                # 这个方式之前可用，偶尔失败多半是没有前台应用(锁屏等)，不再尝试其他方式
+                return None
+        return None
+
+    def __str__(self):
+        return " ".join(str(s) for s in self._ordered())
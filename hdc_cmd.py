@@ -1,7 +1,9 @@
+import asyncio
 import os
 import subprocess
 
 import comm_tools
+from async_core import AsyncCore
 
 
 class HdcCmd(object):
@@ -87,14 +89,15 @@ class HdcCmd(object):
             return True
         raise ValueError("hdc not connection!!! Please check!!!")
 
-    def run_cmd_result_code(self, cmd):
-        self.check_connect()
+    async def run_cmd_async(self, cmd):
+        await asyncio.to_thread(self.check_connect)
         _cmd = f"{self.hdc()} -t {self._target} {cmd}"
         if self._open_log:
             print(f"run {_cmd}")
-        process = subprocess.Popen(str(_cmd).split(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        out, err = process.communicate()
-        return process.returncode, out, err
+        return await AsyncCore.exec(str(_cmd).split())
+
+    def run_cmd_result_code(self, cmd):
+        return AsyncCore.run(self.run_cmd_async(cmd))
 
     def run_cmd(self, cmd) -> str:
         code, out, err = self.run_cmd_result_code(cmd)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+解析 `logcat -B` 输出的二进制日志记录(logger_entry)，跳过 `-v long` 文本解析
+@date:     2026/10/18
+"""
+import struct
+from typing import Optional
+
+import comm_tools
+from log_info import LogInfo, LogTimeHelper
+from log_print_ctr import LogPrintCtr
+
+
+class LogBinaryParser(object):
+    # struct logger_entry {
+    #     uint16_t len;       /* length of the payload */
+    #     uint16_t hdr_size;  /* sizeof(struct logger_entry), 0 for v1 */
+    #     int32_t  pid;
+    #     uint32_t tid;
+    #     uint32_t sec;
+    #     uint32_t nsec;
+    #     uint32_t lid;       /* v3+ */
+    #     uint32_t uid;       /* v4 */
+    # };
+    # payload: <priority:uint8><tag>\0<msg>\0
+    HEAD_SIZE = struct.Struct("<HH")
+    HEAD_BODY = struct.Struct("<iIII")
+    HEAD_UID = struct.Struct("<I")
+    HEAD_UID_OFFSET = 24
+    HEAD_V1_SIZE = 20
+    HEAD_SIZES = (20, 24, 28)
+    PRIORITY_NAMES = ("", "", "V", "D", "I", "W", "E", "F", "S")
+
+    def __init__(self, _log_printer: LogPrintCtr = None):
+        self._log_printer = _log_printer
+        self._buf = bytearray()
+
+    def _build_log_info(self, pid: int, tid: int, sec: int, nsec: int, uid: Optional[int],
+                        payload: bytes) -> Optional[LogInfo]:
+        if len(payload) < 2:
+            return None
+        _priority = payload[0]
+        _tag_end = payload.find(b"\0", 1)
+        if _tag_end < 0:
+            return None
+        log = LogInfo(
+            _date=None,
+            _time=None,
+            _pid=pid,
+            _tid=tid,
+            _priority=self.PRIORITY_NAMES[_priority] if _priority < len(self.PRIORITY_NAMES) else "",
+            _tag=comm_tools.get_str(payload[1:_tag_end]),
+            _ts_ns=sec * LogTimeHelper.NS + nsec,
+            _uid=uid)
+        log.set_msg_bytes(payload[_tag_end + 1:])
+        return log
+
+    def reset(self):
+        """
+        logcat 结束时丢弃不完整的记录，重启后的数据从记录开头开始
+        """
+        self._buf.clear()
+
+    def feed(self, data: bytes):
+        """
+        追加读取到的数据，解析其中完整的记录，不完整的尾部留到下一次
+        :param data: logcat -B 输出的原始字节
+        """
+        buf = self._buf
+        buf += data
+        size = len(buf)
+        offset = 0
+        try:
+            while size - offset >= self.HEAD_SIZE.size:
+                payload_len, hdr_size = self.HEAD_SIZE.unpack_from(buf, offset)
+                if hdr_size == 0:
+                    hdr_size = self.HEAD_V1_SIZE
+                if hdr_size not in self.HEAD_SIZES:
+                    # 数据已错位，丢弃当前缓存
+                    offset = size
+                    raise ValueError(f"logger_entry hdr_size error: {hdr_size}")
+                end = offset + hdr_size + payload_len
+                if end > size:
+                    break
+                pid, tid, sec, nsec = self.HEAD_BODY.unpack_from(buf, offset + self.HEAD_SIZE.size)
+                uid = None
+                if hdr_size > self.HEAD_UID_OFFSET:
+                    uid = self.HEAD_UID.unpack_from(buf, offset + self.HEAD_UID_OFFSET)[0]
+                payload = bytes(buf[offset + hdr_size:end])
+                offset = end
+                log = self._build_log_info(pid, tid, sec, nsec, uid, payload)
+                if log:
+                    self._log_printer.print(log)
+        finally:
+            del buf[:offset]
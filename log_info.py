@@ -2,6 +2,9 @@
 # -*- coding: utf-8 -*-
 # Created by wswenyue on 2018/11/4.
 
+import time
+from typing import List, Optional, Tuple
+
 import comm_tools
 from app_info import AppInfoHelper
 
@@ -14,59 +17,107 @@ class LogLevelHelper(object):
     ERROR = 6
     UNKNOWN = 0
 
+    _CODES = {
+        "2": VERBOSE, "V": VERBOSE, "v": VERBOSE,
+        "3": DEBUG, "D": DEBUG, "d": DEBUG,
+        "4": INFO, "I": INFO, "i": INFO,
+        "5": WARN, "W": WARN, "w": WARN,
+        "6": ERROR, "E": ERROR, "e": ERROR,
+    }
+    _NAMES = {VERBOSE: "V", DEBUG: "D", INFO: "I", WARN: "W", ERROR: "E"}
+
     @staticmethod
     def level_code(priority: str) -> int:
+        level = LogLevelHelper._CODES.get(priority)
+        if level is not None:
+            return level
         if comm_tools.is_empty(priority):
             return LogLevelHelper.UNKNOWN
-
-        priority = priority.strip()
-        if priority == '2' or priority.upper() == 'V':
-            # VERBOSE
-            level = LogLevelHelper.VERBOSE
-        elif priority == '3' or priority.upper() == 'D':
-            # DEBUG
-            level = LogLevelHelper.DEBUG
-        elif priority == '4' or priority.upper() == 'I':
-            # INFO
-            level = LogLevelHelper.INFO
-        elif priority == '5' or priority.upper() == 'W':
-            # WARN
-            level = LogLevelHelper.WARN
-        elif priority == '6' or priority.upper() == 'E':
-            # ERROR
-            level = LogLevelHelper.ERROR
-        else:
-            level = LogLevelHelper.UNKNOWN
-        return level
+        return LogLevelHelper._CODES.get(priority.strip(), LogLevelHelper.UNKNOWN)
 
     @staticmethod
     def level_name(code: int) -> str:
-        if code == 2:
-            priority = "V"
-        elif code == 3:
-            priority = "D"
-        elif code == 4:
-            priority = "I"
-        elif code == 5:
-            priority = "W"
-        elif code == 6:
-            priority = "E"
-        else:
-            priority = "UnKnown"
+        return LogLevelHelper._NAMES.get(code, "UnKnown")
+
+
+class LogTimeHelper(object):
+    """
+    日志时间: 整数纳秒时间戳 <-> 显示用的 MM-DD 和 HH:MM:SS.mmm(本机时区)
+    同一秒内的日志很多，按秒缓存转换结果
+    """
+    NS = 1000000000
+    # 小数部分位数 -> 转换为纳秒的倍数
+    _FRAC_SCALE = tuple(10 ** (9 - size) for size in range(10))
+    # (秒, MM-DD, HH:MM:SS)
+    _format_cache: Tuple[int, str, str] = (-1, "", "")
+    # ((MM-DD, HH:MM:SS), 秒)
+    _parser_cache: Tuple[Tuple[str, str], int] = (("", ""), 0)
 
-        return priority
+    @staticmethod
+    def format(sec: int, nsec: int) -> Tuple[str, str]:
+        cache = LogTimeHelper._format_cache
+        if cache[0] != sec:
+            _local = time.localtime(sec)
+            cache = (sec, time.strftime("%m-%d", _local), time.strftime("%H:%M:%S", _local))
+            LogTimeHelper._format_cache = cache
+        return cache[1], f"{cache[2]}.{nsec // 1000000:03d}"
 
+    @staticmethod
+    def parser(_date: str, _time: str) -> Optional[int]:
+        """
+        `-v long` 的时间没有年份，取当前年份，得到的时间比现在晚一天以上时是去年的日志(跨年)
+        :return: 纳秒时间戳，格式不对时返回 None
+        """
+        hms, _, frac = _time.partition(".")
+        key = (_date, hms)
+        cache = LogTimeHelper._parser_cache
+        if cache[0] != key:
+            try:
+                month, day = _date.split("-")
+                hour, minute, second = hms.split(":")
+                now = time.time()
+                year = time.localtime(now).tm_year
+                _tuple = (int(month), int(day), int(hour), int(minute), int(second), 0, 0, -1)
+                sec = int(time.mktime((year,) + _tuple))
+                if sec > now + 86400:
+                    sec = int(time.mktime((year - 1,) + _tuple))
+            except (ValueError, OverflowError):
+                return None
+            cache = (key, sec)
+            LogTimeHelper._parser_cache = cache
+        return cache[1] * LogTimeHelper.NS + (LogTimeHelper.parser_ns(frac) if frac.isdecimal() else 0)
+
+    @staticmethod
+    def parser_ns(frac: str, sec: str = "") -> int:
+        """
+        :param frac: 秒的小数部分(毫秒/微秒/纳秒精度)，只包含数字
+        :param sec: 秒(只包含数字)，拼在一起只转换一次
+        :return: sec 秒 + frac 对应的纳秒
+        """
+        frac = frac[:9]
+        return int(sec + frac) * LogTimeHelper._FRAC_SCALE[len(frac)]
 
-class LogInfo(object):
 
-    def __init__(self, _date: str, _time: str, _pid: str, _tid: str, _priority: str, _tag: str):
+class LogInfo(object):
+    __slots__ = ("_date", "_time", "_pid", "_tid", "_level", "_tag", "_msg", "_msg_content", "_ts_ns", "_uid")
+
+    def __init__(self, _date: Optional[str], _time: Optional[str], _pid: int, _tid: int, _priority: str, _tag: str,
+                 _ts_ns: Optional[int] = None, _uid: Optional[int] = None):
+        """
+        :param _date: 为 None 时在用到时由 _ts_ns 生成(过滤掉的日志不需要)
+        :param _ts_ns: 纳秒时间戳(`-v epoch` 或者 -B)，None 时由 _date 和 _time 推算
+        """
         self._date = _date
         self._time = _time
         self._pid = _pid
         self._tid = _tid
-        self._priority = _priority
+        self._level = LogLevelHelper.level_code(_priority)
         self._tag = _tag
         self._msg = None
+        # get_msg_content 的结果，追加内容后失效
+        self._msg_content = None
+        self._ts_ns = _ts_ns
+        self._uid = _uid
 
     @property
     def tag(self) -> str:
@@ -74,54 +125,106 @@ class LogInfo(object):
 
     @property
     def time(self) -> str:
+        if self._time is None:
+            self._format_time()
         return self._time
 
+    @property
+    def date(self) -> str:
+        if self._date is None:
+            self._format_time()
+        return self._date
+
+    def _format_time(self):
+        self._date, self._time = LogTimeHelper.format(*divmod(self._ts_ns, LogTimeHelper.NS))
+
+    @property
+    def pid(self) -> int:
+        return self._pid
+
+    @property
+    def uid(self) -> Optional[int]:
+        return self._uid
+
+    @property
+    def ts_ns(self) -> Optional[int]:
+        """
+        纳秒时间戳，可以直接比较、计算时间差
+        """
+        if self._ts_ns is not None:
+            return self._ts_ns
+        return LogTimeHelper.parser(self._date, self._time)
+
+    def get_since_time(self) -> str:
+        """
+        :return: `logcat -T` 的参数，从这条日志的时间开始输出
+        """
+        if self._ts_ns is not None:
+            # logcat 文档中的格式是 sssss.mmm
+            sec, nsec = divmod(self._ts_ns, LogTimeHelper.NS)
+            return f"{sec}.{nsec // 1000000:03d}"
+        return f"{self.date} {self.time}"
+
     def append_msg_content(self, _content: str):
-        if comm_tools.is_empty(_content):
-            return
-        if not self._msg:
-            self._msg = []
-        self._msg.append(comm_tools.get_str(_content).strip())
+        """
+        :param _content: 已经 strip 过的非空行，只保存引用，用到时再拼接
+        """
+        msg = self._msg
+        if msg is None:
+            self._msg = [_content]
+        elif type(msg) is list:
+            msg.append(_content)
+        else:
+            self._msg = LogInfo._decode_lines(msg) + [_content]
+        self._msg_content = None
+
+    def set_msg_bytes(self, _content: bytes):
+        """
+        整段日志内容(-B 的 payload)，用到时再解码和按行处理，过滤掉的日志不需要
+        """
+        self._msg = _content
+        self._msg_content = None
+
+    @staticmethod
+    def _decode_lines(_content: bytes) -> List[str]:
+        # 和 comm_tools.is_empty 一样跳过空行和 "None"
+        lines = []
+        for line in comm_tools.get_str(_content.rstrip(b"\0")).split("\n"):
+            stripped = line.strip()
+            if stripped and line != "None":
+                lines.append(stripped)
+        return lines
 
     def get_msg_content(self):
-        if not self._msg:
+        msg = self._msg
+        if not msg:
             return ""
-        _content = ""
-        for index, line in enumerate(self._msg):
-            if comm_tools.is_empty(line):
-                continue
-            if index == 0:
-                _content += line
-            else:
-                _content += ("\n\t\t" + line)
-        return _content.strip()
+        if self._msg_content is None:
+            if type(msg) is not list:
+                msg = LogInfo._decode_lines(msg)
+            self._msg_content = "\n\t\t".join(msg).strip()
+        return self._msg_content
 
     def get_process_name(self):
-        name = AppInfoHelper.found_name_by_pid(self._pid)
-        if not name:
-            return self._pid
-        return name
+        info = AppInfoHelper.found_process_by_pid(self._pid)
+        if not info:
+            return str(self._pid)
+        return info.name
 
     def get_show_name(self):
-        name = AppInfoHelper.found_name_by_pid(self._pid)
-        if not name:
-            return self._pid
-        if ":" in name:
-            # 子进程
-            _s = name.split(":")
-            return _s[0].split(".")[-1] + "@" + _s[1]
-        else:
-            # 主进程
-            return name.split(".")[-1] + "@main"
+        info = AppInfoHelper.found_process_by_pid(self._pid)
+        if not info:
+            return str(self._pid)
+        return info.show_name
 
     def get_show_tid(self):
         if self._pid == self._tid:
-            return self._tid
+            return str(self._tid)
         else:
             return f"{self._tid}❗"
 
-    def get_level(self):
-        return LogLevelHelper.level_code(self._priority)
+    def get_level(self) -> int:
+        return self._level
 
     def get_level_name(self):
-        return LogLevelHelper.level_name(self.get_level())
+        return LogLevelHelper.level_name(self._level)
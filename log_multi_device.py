@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+同时读取多台设备的日志:
+每台设备一个子进程(独立的 logcat 读取、解析过滤和 AppInfoHelper 进程信息) -> 主进程按日志时间合并输出，增加设备列
+@date:     2026/10/18
+"""
+import heapq
+import multiprocessing
+import queue
+import time
+from typing import Callable, Dict, List, Tuple, Union
+
+import color_print
+from color_print import Colors, ColorStr
+from log_info import LogInfo
+from log_output import BufferedLogWriter, LogSink, StreamSink
+from log_print_ctr import LogPrintCtr
+
+# 子进程输出的每一行前面加上日志的纳秒时间戳(固定宽度，按字符串比较和按数值比较结果相同)和分隔符，主进程按它排序
+_TIME_SIZE = 20
+
+
+class DeviceLogPrintCtr(LogPrintCtr):
+    """
+    子进程中使用，输出内容带上日志时间，并统计读取的日志条数
+    """
+    entries = 0
+
+    def print(self, log: LogInfo):
+        DeviceLogPrintCtr.entries += 1
+        super().print(log)
+
+    def render(self, log: LogInfo, p_msg: Union[str, ColorStr]) -> str:
+        return f"{log.ts_ns or 0:0{_TIME_SIZE}d} {super().render(log, p_msg)}"
+
+    def print_line(self, line: str):
+        # 不是日志的行没有时间，使用上一条日志的时间，合并时排在它后面
+        last_log = self.last_log
+        ts_ns = (last_log.ts_ns or 0) if last_log else 0
+        super().print_line(f"{ts_ns:0{_TIME_SIZE}d} {line}")
+
+
+class DeviceQueueSink(LogSink):
+    """
+    子进程中把一批输出发送给主进程: (serial, 已读取的日志条数, lines)
+    """
+
+    def __init__(self, serial: str, out_queue: multiprocessing.Queue):
+        self._serial = serial
+        self._queue = out_queue
+
+    def write(self, line: str):
+        self.write_lines([line])
+
+    def write_lines(self, lines: List[str]):
+        self._queue.put((self._serial, DeviceLogPrintCtr.entries, lines))
+
+
+class _DeviceStats(object):
+    def __init__(self):
+        self.entries = 0
+        self.printed = 0
+
+
+class MultiDeviceLog(object):
+    # 收到日志后最多等待的时间(秒)，用来和其他设备的日志按时间排序
+    MERGE_DELAY = 0.2
+    POLL_DELAY = 0.05
+
+    def __init__(self, serials: List[str], run_device: Callable[[str, multiprocessing.Queue], None]):
+        """
+        :param run_device: 子进程中执行，(serial, queue)，需要能被 pickle
+        """
+        self._serials = serials
+        self._run_device = run_device
+        width = max(len(serial) for serial in serials)
+        self._labels = {serial: Colors.Cyan.format(serial.ljust(width)) + " " for serial in serials}
+        self._stats: Dict[str, _DeviceStats] = {serial: _DeviceStats() for serial in serials}
+        # (日志时间, 序号, 收到的时间, serial, 内容)
+        self._heap: List[Tuple[str, int, float, str, str]] = []
+        self._seq = 0
+        self._writer = BufferedLogWriter(StreamSink())
+
+    def _push(self, serial: str, entries: int, lines: List[str]):
+        stats = self._stats[serial]
+        stats.entries = entries
+        stats.printed += len(lines)
+        now = time.monotonic()
+        for line in lines:
+            self._seq += 1
+            heapq.heappush(self._heap, (line[:_TIME_SIZE], self._seq, now, serial, line[_TIME_SIZE + 1:]))
+
+    def _pop(self, deadline: float):
+        """
+        输出收到时间早于 deadline 的日志，按日志时间顺序
+        """
+        heap = self._heap
+        while heap and heap[0][2] <= deadline:
+            _, _, _, serial, line = heapq.heappop(heap)
+            self._writer.write(self._labels[serial] + line)
+
+    def run(self):
+        context = multiprocessing.get_context("spawn")
+        out_queue = context.Queue()
+        processes = [context.Process(target=self._run_device, args=(serial, out_queue), daemon=True)
+                     for serial in self._serials]
+        begin = time.perf_counter()
+        for process in processes:
+            process.start()
+        try:
+            while True:
+                try:
+                    self._push(*out_queue.get(timeout=self.POLL_DELAY))
+                except queue.Empty:
+                    if not any(process.is_alive() for process in processes):
+                        break
+                self._pop(time.monotonic() - self.MERGE_DELAY)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for process in processes:
+                process.terminate()
+            self._pop(float("inf"))
+            self._writer.close()
+            self._print_stats(time.perf_counter() - begin)
+
+    def _print_stats(self, cost: float):
+        cost = max(cost, 1e-6)
+        msg = f"==========devices stats ({len(self._serials)} devices, {cost:.2f}s)=========="
+        for serial, stats in self._stats.items():
+            msg += f"\n{serial}: entries: {stats.entries} ({stats.entries / cost:.0f}/s); " \
+                   f"printed: {stats.printed} ({stats.printed / cost:.0f}/s)"
+        color_print.green(msg)
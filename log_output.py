@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+日志输出目标: 终端、文件、管道
+BufferedLogWriter 把多行合并成一次写入，按大小、时间或空闲刷新
+@date:     2026/10/18
+"""
+import sys
+import threading
+import time
+from abc import ABCMeta, abstractmethod
+from typing import List, Optional, TextIO
+
+from comm_tools import new_thread
+
+
+class LogSink(metaclass=ABCMeta):
+    """
+    输出目标，write 的每一项是一行完整的日志(不含换行)
+    """
+
+    @abstractmethod
+    def write(self, line: str):
+        pass
+
+    def write_lines(self, lines: List[str]):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class StreamSink(LogSink):
+    """
+    写入文本流，默认是标准输出，管道或者已打开的文件也可以用
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self._stream = stream
+
+    @property
+    def stream(self) -> TextIO:
+        # 不在构造时保存 sys.stdout，运行中被替换(重定向)后依然有效
+        return self._stream if self._stream is not None else sys.stdout
+
+    def write(self, line: str):
+        self.stream.write(line + "\n")
+
+    def write_lines(self, lines: List[str]):
+        stream = self.stream
+        stream.write("\n".join(lines))
+        stream.write("\n")
+
+    def flush(self):
+        self.stream.flush()
+
+
+class FileSink(StreamSink):
+    def __init__(self, path: str, mode: str = "a", encoding: str = "utf-8"):
+        super().__init__(open(path, mode, encoding=encoding))
+
+    def close(self):
+        super().close()
+        self._stream.close()
+
+
+class BufferedLogWriter(LogSink):
+    """
+    缓存多行日志后一次写入 sink，以下情况刷新:
+    1. 缓存的字符数超过 max_size
+    2. 第一行缓存后超过 delay 秒(后台线程)，日志稀疏或者读取空闲时保证延迟
+    3. 主动调用 flush/close
+    """
+    MAX_SIZE = 64 * 1024
+    DELAY = 0.05
+
+    def __init__(self, sink: LogSink, max_size: int = MAX_SIZE, delay: float = DELAY):
+        self._sink = sink
+        self._max_size = max_size
+        self._delay = delay
+        self._lock = threading.Lock()
+        self._lines: List[str] = []
+        self._size = 0
+        self._deadline: Optional[float] = None
+        self._wakeup = threading.Event()
+        self._closed = False
+        new_thread(self._run_flusher, name="log-writer-flusher")
+
+    def write(self, line: str):
+        with self._lock:
+            self._lines.append(line)
+            self._size += len(line) + 1
+            if self._size >= self._max_size:
+                self._flush_locked()
+            elif self._deadline is None:
+                self._deadline = time.monotonic() + self._delay
+                self._wakeup.set()
+
+    def _flush_locked(self):
+        self._deadline = None
+        if not self._lines:
+            return
+        lines = self._lines
+        self._lines = []
+        self._size = 0
+        self._sink.write_lines(lines)
+        self._sink.flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+        self._sink.close()
+
+    def _run_flusher(self):
+        while not self._closed:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            deadline = self._deadline
+            if deadline is None:
+                continue
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            with self._lock:
+                # 等待期间可能已经按大小刷新过，新的缓存有自己的截止时间
+                if self._deadline is not None and self._deadline <= time.monotonic():
+                    self._flush_locked()
+                elif self._deadline is not None:
+                    self._wakeup.set()
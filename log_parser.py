@@ -5,17 +5,27 @@
 @date:     2022/11/10 
 """
 import re
+from typing import List, Optional
 
-import color_print
-import comm_tools
+from color_print import Colors
 from log_print_ctr import LogPrintCtr
-from log_info import LogInfo
+from log_info import LogInfo, LogTimeHelper
+
+# `-v uid` 中不超过 5 个字符的用户名输出名字，其他输出数字
+_UID_NAMES = {"root": 0, "radio": 1001, "input": 1004, "audio": 1005, "log": 1007, "wifi": 1010, "media": 1013,
+              "dhcp": 1014, "drm": 1019, "nfc": 1027, "shell": 2000}
 
 
 class LogMsgParser(object):
     # [ <datetime> <pid>:<tid> <priority>/<tag> ]
     # [ 08-28 22:39:39.974  1785: 1832 D/HeadsetStateMachine ]
     PATTERN_HEAD = re.compile(r"^\[\s*(\d{2}-\d{2})\s*(\d{2}:\d{2}:\d{2}.\d+)\s*(\d+):\s*(\d+)\s*([IDEVW])\/(.*)\]$")
+    # `-v long,epoch,uid`: [ <sec>.<ms> <uid>:<pid>:<tid> <priority>/<tag> ]
+    # [ 1700000000.974 10123: 2311: 2320 D/HeadsetStateMachine ]
+    PATTERN_HEAD_EPOCH = re.compile(r"\[ +(\d+)\.(\d+) +(?:(\w+): *)?(\d+): *(\d+) ([IDEVW])/(.*)\]")
+    # 读取日志使用的格式，设备不支持时(Android 7 以下)使用 FORMAT_LEGACY
+    FORMAT = "long,epoch,uid,printable"
+    FORMAT_LEGACY = "long"
     log = None
 
     def __init__(self, _log_printer: LogPrintCtr = None):
@@ -24,31 +34,87 @@ class LogMsgParser(object):
     @staticmethod
     def _build_log_info(group) -> LogInfo:
         return LogInfo(
-            _date=comm_tools.get_str(group[0]),
-            _time=comm_tools.get_str(group[1]),
-            _pid=comm_tools.get_str(group[2]),
-            _tid=comm_tools.get_str(group[3]),
-            _priority=comm_tools.get_str(group[4]),
-            _tag=comm_tools.get_str(group[5]))
-
-    def parser(self, msg):
-        if comm_tools.is_empty(msg):
+            _date=group[0],
+            _time=group[1],
+            _pid=int(group[2]),
+            _tid=int(group[3]),
+            _priority=group[4],
+            _tag=group[5])
+
+    @staticmethod
+    def _build_log_info_epoch(group) -> LogInfo:
+        uid = group[2]
+        if uid is not None:
+            uid = int(uid) if uid.isdecimal() else _UID_NAMES.get(uid)
+        return LogInfo(
+            _date=None,
+            _time=None,
+            _pid=int(group[3]),
+            _tid=int(group[4]),
+            _priority=group[5],
+            _tag=group[6],
+            _ts_ns=LogTimeHelper.parser_ns(group[1], group[0]),
+            _uid=uid)
+
+    def parser(self, msg: str):
+        """
+        :param msg: 已经 strip 过的行
+        """
+        if not msg or msg == "None":
             return
-        group = self.parser_head(msg)
-        if group:
+        log = self.parser_head(msg)
+        if log:
             if self.log:
                 self._log_printer.print(self.log)
-                self.log = None
-            self.log = LogMsgParser._build_log_info(group)
+            self.log = log
         else:
             if self.log:
                 self.log.append_msg_content(msg)
             else:
-                color_print.light_gray(">>>>" + str(msg).strip())
+                self._log_printer.print_line(Colors.LightGray.format(">>>>" + msg))
 
-    def parser_head(self, _msg):
-        match = self.PATTERN_HEAD.search(_msg)
-        if match:
-            return match.groups()
-        else:
+    def parser_lines(self, lines: List[str]):
+        """
+        批量解析一个数据块中的行
+        :param lines: 已经 strip 过的行
+        """
+        for msg in lines:
+            if not msg:
+                continue
+            try:
+                self.parser(msg)
+            except Exception as e:
+                self._log_printer.print_line(Colors.RED.format("===========Parser Error==============="))
+                self._log_printer.print_line(Colors.RED.format(str(e)))
+                self._log_printer.print_line(f"==>{msg}<==")
+
+    def flush(self):
+        """
+        输出最后一条还在等待后续内容的日志
+        """
+        if self.log:
+            self._log_printer.print(self.log)
+            self.log = None
+
+    def reset(self):
+        """
+        丢弃最后一条还在等待后续内容的日志(logcat 被重启，内容可能不完整)
+        """
+        self.log = None
+
+    @staticmethod
+    def parser_head(_msg: str) -> Optional[LogInfo]:
+        """
+        :param _msg: 已经 strip 过的行
+        :return: 日志头解析出的 LogInfo，不是日志头时返回 None
+        """
+        # 绝大部分行是日志内容，只看首尾字符就能排除，不用再执行两个正则
+        if _msg[0] != "[" or _msg[-1] != "]":
+            return None
+        match = LogMsgParser.PATTERN_HEAD_EPOCH.fullmatch(_msg)
+        if match is not None:
+            return LogMsgParser._build_log_info_epoch(match.groups())
+        match = LogMsgParser.PATTERN_HEAD.search(_msg)
+        if match is None:
             return None
+        return LogMsgParser._build_log_info(match.groups())
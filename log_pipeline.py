@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多进程解析/过滤日志:
+读取线程按日志条目边界切分批次 -> 进程池解析并执行 level/tag/msg 过滤 -> 主进程按原始顺序做包名过滤并输出
+@date:     2026/10/18
+"""
+import multiprocessing
+import multiprocessing.pool
+import signal
+import subprocess
+import time
+from typing import List, Iterator, Optional, Tuple, Union
+
+import color_print
+from app_info import AppInfoHelper
+from color_print import ColorStr
+from log_info import LogInfo
+from log_parser import LogMsgParser
+from log_print_ctr import LogPrintCtr
+from log_reader import LogStreamReader
+
+_worker_printer: Optional[LogPrintCtr] = None
+
+
+class _BatchCollector(object):
+    """
+    子进程中代替 LogPrintCtr 接收解析结果，只保留通过过滤的日志和进程事件(p_msg 为 None 时只用于更新进程表)，
+    不是日志的行(解析错误等)记为 (None, line)，由主进程按顺序输出
+    """
+
+    def __init__(self, log_printer: LogPrintCtr):
+        self._log_printer = log_printer
+        self.count = 0
+        self.last_log: Optional[LogInfo] = None
+        self.logs: List[Tuple[Optional[LogInfo], Optional[Union[str, ColorStr]]]] = []
+
+    def print(self, log: LogInfo):
+        self.count += 1
+        self.last_log = log
+        is_event = self._log_printer.is_process_event(log)
+        if not self._log_printer.filter_head(log):
+            if is_event:
+                self.logs.append((log, None))
+            return
+        p_msg = self._log_printer.filter_msg(log)
+        if p_msg or is_event:
+            self.logs.append((log, p_msg or None))
+
+    def print_line(self, line: str):
+        self.logs.append((None, line))
+
+
+def _init_worker(log_printer: LogPrintCtr):
+    global _worker_printer
+    _worker_printer = log_printer
+    # Ctrl+C 由主进程处理
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _parse_batch(lines: List[str]) -> Tuple[int, Optional[LogInfo],
+                                            List[Tuple[Optional[LogInfo], Optional[Union[str, ColorStr]]]]]:
+    collector = _BatchCollector(_worker_printer)
+    parser = LogMsgParser(collector)
+    parser.parser_lines(lines)
+    parser.flush()
+    return collector.count, collector.last_log, collector.logs
+
+
+class LogPipeline(object):
+
+    def __init__(self, log_printer: LogPrintCtr, workers: int):
+        self._log_printer = log_printer
+        self._workers = workers
+        self._lines = 0
+        self._batches = 0
+        self._entries = 0
+        self._printed = 0
+        self._begin = 0.0
+        self._pool: Optional[multiprocessing.pool.Pool] = None
+        # logcat 结束时还没有处理的最后一条日志，由 finish() 决定输出还是丢弃
+        self._carry: List[str] = []
+
+    @staticmethod
+    def _found_last_head(lines: List[str]) -> int:
+        for index in range(len(lines) - 1, -1, -1):
+            line = lines[index]
+            if line and LogMsgParser.parser_head(line):
+                return index
+        return -1
+
+    def _iter_batches(self, pro: subprocess.Popen) -> Iterator[List[str]]:
+        """
+        每个批次都从日志头开始，最后一条日志可能还有后续内容，留到下一批次，结束时留给 finish()
+        """
+        carry: List[str] = []
+        for lines in LogStreamReader(pro).iter_lines():
+            self._lines += len(lines)
+            batch = carry + lines if carry else lines
+            cut = self._found_last_head(batch)
+            if cut <= 0:
+                carry = batch
+                continue
+            carry = batch[cut:]
+            self._batches += 1
+            yield batch[:cut]
+        self._carry = carry
+
+    def _print_stats(self, cost: float):
+        cost = max(cost, 1e-6)
+        color_print.green(f"==========pipeline stats ({self._workers} workers)==========\n"
+                          f"time: {cost:.2f}s; batches: {self._batches}\n"
+                          f"lines: {self._lines} ({self._lines / cost:.0f}/s)\n"
+                          f"entries: {self._entries} ({self._entries / cost:.0f}/s)\n"
+                          f"printed: {self._printed}\n"
+                          f"pid cache: {self._log_printer.pid_cache}\n"
+                          f"pid resolver: {AppInfoHelper.resolver_stats()}\n"
+                          f"foreground: {AppInfoHelper.foreground_stats()}")
+
+    def run(self, pro: subprocess.Popen):
+        """
+        可以多次调用(logcat 重启)，共用同一个进程池，结束后调用 close()
+        """
+        if self._pool is None:
+            self._begin = time.perf_counter()
+            # spawn: fork 会让子进程继承其他线程正在创建的子进程管道，导致对方读不到 EOF
+            self._pool = multiprocessing.get_context("spawn").Pool(self._workers, initializer=_init_worker,
+                                                                   initargs=(self._log_printer,))
+        # imap 在线程中消费读取的批次，结果按提交顺序返回
+        for result in self._pool.imap(_parse_batch, self._iter_batches(pro)):
+            self._output(*result)
+
+    def finish(self, complete: bool):
+        """
+        run() 之后调用
+        :param complete: False 表示 logcat 被重启，最后一条日志可能不完整，重启后会重新输出，丢弃
+        """
+        carry = self._carry
+        self._carry = []
+        if complete and carry:
+            self._batches += 1
+            self._output(*self._pool.apply(_parse_batch, (carry,)))
+
+    def _output(self, count: int, last_log: Optional[LogInfo],
+                logs: List[Tuple[Optional[LogInfo], Optional[Union[str, ColorStr]]]]):
+        self._entries += count
+        for log, p_msg in logs:
+            if log is None:
+                self._log_printer.print_line(p_msg)
+                continue
+            if self._log_printer.skip_replayed(log):
+                continue
+            if self._log_printer.is_process_event(log):
+                # 进程表只在主进程中维护
+                AppInfoHelper.on_process_event(log.get_msg_content())
+            if p_msg is None:
+                continue
+            if self._log_printer.filter_package(log):
+                self._printed += 1
+                self._log_printer.output(log, p_msg)
+        # 整批都是重启前处理过的日志时 last_log 不能倒退
+        if last_log and not self._log_printer.skip_replayed(last_log):
+            self._log_printer.last_log = last_log
+
+    def close(self):
+        if self._pool is None:
+            return
+        self._pool.terminate()
+        self._pool = None
+        self._log_printer.writer.flush()
+        self._print_stats(time.perf_counter() - self._begin)
@@ -4,9 +4,37 @@
 @author:   wswenyue
 @date:     2022/11/10 
 """
-from color_print import ColorStrArr, SimpleColorStr, Colors, ColorStr
+from typing import Optional, Union, Tuple
+
+from app_info import AppInfoHelper
+from color_print import Colors, ColorStr, AsciiColor
+from comm_tools import LruCache
 from content_filter_format import LogPackageFilterFormat, LogTagFilterFormat, LogMsgFilterFormat, LogLevelFilterFormat
 from log_info import LogInfo, LogLevelHelper
+from log_output import LogSink, StreamSink
+
+
+class _LevelStyle(object):
+    """
+    同一日志级别的颜色转义序列是固定的，提前拼好，输出时只拼接一次字符串
+    输出格式: {time} {name} {tid} {level} {tag}: {msg}
+    """
+
+    def __init__(self, level: int, base_color: AsciiColor, tag_color: AsciiColor):
+        level_color = tag_color.copy()
+        level_color.style = "underline"
+        self.base_color = base_color
+        self.head = str(Colors.Gray)
+        self.level = f"{AsciiColor.RESET}{level_color}{LogLevelHelper.level_name(level)}{AsciiColor.RESET}{tag_color} "
+        self.tag_end = f": {AsciiColor.RESET}"
+        self.msg_begin = str(base_color)
+
+    def render(self, p_time: str, p_name: str, p_tid: str, p_tag: str, p_msg: Union[str, ColorStr]) -> str:
+        if isinstance(p_msg, ColorStr):
+            # 带高亮的内容仍然由 ColorStr 处理
+            p_msg.base_color = self.base_color
+            return f"{self.head}{p_time} {p_name} {p_tid} {self.level}{p_tag}{self.tag_end}{p_msg}"
+        return f"{self.head}{p_time} {p_name} {p_tid} {self.level}{p_tag}{self.tag_end}{self.msg_begin}{p_msg}{AsciiColor.RESET}"
 
 
 class LogPrintCtr(object):
@@ -17,6 +45,35 @@ class LogPrintCtr(object):
     _tag: LogTagFilterFormat = None
     _msg: LogMsgFilterFormat = None
     _level: LogLevelFilterFormat = None
+    # 最后一条日志，重启 logcat 时从它的时间继续
+    last_log: Optional[LogInfo] = None
+    # 重启 logcat 前的最后一条日志 (ts_ns, pid, tag, msg)，新的 logcat 会重复输出它和同一毫秒内更早的日志
+    _resume: Optional[Tuple[int, int, str, str]] = None
+    PID_CACHE_SIZE = 4096
+    _LEVEL_STYLES = {
+        LogLevelHelper.DEBUG: _LevelStyle(LogLevelHelper.DEBUG, Colors.Green, Colors.LightGreen),
+        LogLevelHelper.ERROR: _LevelStyle(LogLevelHelper.ERROR, Colors.RED, Colors.LightRed),
+        LogLevelHelper.WARN: _LevelStyle(LogLevelHelper.WARN, Colors.Yellow, Colors.LightYellow),
+        LogLevelHelper.INFO: _LevelStyle(LogLevelHelper.INFO, Colors.Blue, Colors.LightBlue),
+        LogLevelHelper.VERBOSE: _LevelStyle(LogLevelHelper.VERBOSE, Colors.Gray, Colors.LightGray),
+    }
+    _UNKNOWN_STYLE = _LevelStyle(LogLevelHelper.UNKNOWN, Colors.Gray, Colors.LightGray)
+
+    def __init__(self):
+        # pid -> 包名过滤结果，进程信息或前台应用变化(AppInfoHelper.generation)时清空
+        self.pid_cache = LruCache(self.PID_CACHE_SIZE)
+        self._pid_cache_generation = -1
+        self.writer: LogSink = StreamSink()
+
+    def __getstate__(self):
+        # 多进程解析时会 pickle 到子进程，输出目标只在主进程使用
+        state = self.__dict__.copy()
+        del state["writer"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.writer = StreamSink()
 
     @property
     def package(self) -> LogPackageFilterFormat:
@@ -50,52 +107,96 @@ class LogPrintCtr(object):
     def level(self, _level: LogLevelFilterFormat):
         self._level = _level
 
+    def filter_package(self, log: LogInfo) -> bool:
+        """
+        包名过滤，依赖当前进程信息(AppInfoHelper)，只能在主进程中执行
+        """
+        generation = AppInfoHelper.generation()
+        if generation != self._pid_cache_generation:
+            self.pid_cache.clear()
+            self._pid_cache_generation = generation
+        verdict = self.pid_cache.get(log.pid)
+        if verdict is None:
+            verdict = bool(self.package.format_content(log.get_process_name()))
+            self.pid_cache.put(log.pid, verdict)
+        return verdict
+
+    def filter_head(self, log: LogInfo) -> bool:
+        """
+        level/tag 过滤，只依赖日志头，代价最低
+        """
+        if self.level.target and not self.level.filter_code(log.get_level()):
+            return False
+        if not log.tag:
+            return False
+        return self.tag.is_accept_all or self.tag.filter(log.tag)
+
+    def filter_msg(self, log: LogInfo) -> Optional[Union[str, ColorStr]]:
+        """
+        内容过滤，需要拼接日志内容，放在最后
+        :return: None 表示丢弃，否则返回要输出的内容
+        """
+        p_msg = self.msg.format_content(log.get_msg_content())
+        if not p_msg:
+            return None
+        return p_msg
+
+    @staticmethod
+    def is_process_event(log: LogInfo) -> bool:
+        # -v long 的 tag 后面可能有空格
+        tag = log.tag
+        return tag.startswith(AppInfoHelper.AM_TAG) and tag.rstrip() == AppInfoHelper.AM_TAG
+
+    def resume_after(self, log: LogInfo):
+        """
+        `logcat -T` 从 log 所在的毫秒开始重新输出，跳过 log 以及之前已经处理过的日志
+        """
+        ts_ns = log.ts_ns
+        self._resume = None if ts_ns is None else (ts_ns, log.pid, log.tag, log.get_msg_content())
+
+    def skip_replayed(self, log: LogInfo) -> bool:
+        """
+        :return: True 表示是重启前已经处理过的日志
+        """
+        if self._resume is None:
+            return False
+        ts_ns = log.ts_ns
+        resume_ts, pid, tag, msg = self._resume
+        if ts_ns is None or ts_ns > resume_ts:
+            self._resume = None
+            return False
+        if ts_ns == resume_ts and log.pid == pid and log.tag == tag and log.get_msg_content() == msg:
+            # 之后都是新日志
+            self._resume = None
+        return True
+
     def print(self, log: LogInfo):
         if log is None:
             return
-        p_package = self.package.format_content(log.get_process_name())
-        if not p_package:
+        if self.skip_replayed(log):
             return
-        p_level = self.level.format_content(log.get_level_name())
-        if not p_level:
+        self.last_log = log
+        if self.is_process_event(log):
+            AppInfoHelper.on_process_event(log.get_msg_content())
+        # 按代价从低到高过滤: level(整数比较) -> tag(缓存) -> 包名(缓存) -> 内容(拼接日志内容)
+        if not self.filter_head(log):
             return
-        p_tag = self.tag.format_content(log.tag)
-        if not p_tag:
+        if not self.filter_package(log):
             return
-        p_msg = self.msg.format_content(log.get_msg_content())
+        p_msg = self.filter_msg(log)
         if not p_msg:
             return
-        p_tid = log.get_show_tid()
-        p_time = log.time
-        p_name = log.get_show_name()
-        # msg = "{0}#{1}#{2}#{3}#{4}#{5}".format(p_time, p_name, p_tid, p_level, p_tag, p_msg)
-        level = log.get_level()
-        if level == LogLevelHelper.DEBUG:
-            base_color = Colors.Green
-            tag_color = Colors.LightGreen
-        elif level == LogLevelHelper.ERROR:
-            base_color = Colors.RED
-            tag_color = Colors.LightRed
-        elif level == LogLevelHelper.WARN:
-            base_color = Colors.Yellow
-            tag_color = Colors.LightYellow
-        elif level == LogLevelHelper.INFO:
-            base_color = Colors.Blue
-            tag_color = Colors.LightBlue
-        elif level == LogLevelHelper.VERBOSE:
-            base_color = Colors.Gray
-            tag_color = Colors.LightGray
-        else:
-            base_color = Colors.Gray
-            tag_color = Colors.LightGray
-        msg = ColorStrArr(base_color)
-        msg.add(SimpleColorStr("{0} {1} {2} ".format(p_time, p_name, p_tid), Colors.Gray))
-        level_color = tag_color.copy()
-        level_color.style = "underline"
-        msg.add(ColorStr(f"{p_level}", level_color))
-        msg.add(ColorStr(f" {p_tag}: ", tag_color))
-        if isinstance(p_msg, ColorStr):
-            msg.add(p_msg)
-        else:
-            msg.add(ColorStr(p_msg, base_color))
-        print(str(msg))
+        self.output(log, p_msg)
+
+    def render(self, log: LogInfo, p_msg: Union[str, ColorStr]) -> str:
+        style = self._LEVEL_STYLES.get(log.get_level(), self._UNKNOWN_STYLE)
+        return style.render(log.time, log.get_show_name(), log.get_show_tid(), log.tag, p_msg)
+
+    def output(self, log: LogInfo, p_msg: Union[str, ColorStr]):
+        self.writer.write(self.render(log, p_msg))
+
+    def print_line(self, line: str):
+        """
+        不是日志的行(解析错误等)，和日志一样经过 writer 输出，保证顺序
+        """
+        self.writer.write(line)
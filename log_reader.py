@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+按块读取子进程输出，代替逐行 readline + poll
+@date:     2026/10/18
+"""
+import subprocess
+from typing import Iterator, List
+
+
+class LogStreamReader(object):
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, pro: subprocess.Popen, block_size: int = BLOCK_SIZE):
+        """
+        :param pro: stdout=subprocess.PIPE 的进程，最好以 bufsize=0 启动，这样每次读取只有一次系统调用
+        :param block_size: 每次读取的最大字节数
+        """
+        self._pro = pro
+        self._stream = pro.stdout
+        self._buf = bytearray(block_size)
+        self._view = memoryview(self._buf)
+        self._tail = b""
+
+    def _read_into(self) -> int:
+        if hasattr(self._stream, "readinto1"):
+            return self._stream.readinto1(self._view)
+        return self._stream.readinto(self._view)
+
+    def iter_blocks(self) -> Iterator[bytes]:
+        """
+        读取原始数据块，直到进程输出结束(EOF)
+        """
+        while True:
+            size = self._read_into()
+            if not size:
+                break
+            yield bytes(self._view[:size])
+        self._pro.poll()
+
+    def iter_lines(self) -> Iterator[List[str]]:
+        """
+        每次返回一个数据块中所有完整的行(已经 strip)，不完整的行留到下一块
+        """
+        while True:
+            size = self._read_into()
+            if not size:
+                break
+            end = self._buf.rfind(b"\n", 0, size)
+            if end < 0:
+                self._tail += self._buf[:size]
+                continue
+            if self._tail:
+                data = self._tail + self._buf[:end + 1]
+            else:
+                data = self._buf[:end + 1]
+            self._tail = bytes(self._buf[end + 1:size])
+            lines = data.decode(encoding="utf-8", errors="ignore").split("\n")
+            lines.pop()
+            yield [line.strip() for line in lines]
+        if self._tail:
+            yield [self._tail.decode(encoding="utf-8", errors="ignore").strip()]
+            self._tail = b""
+        self._pro.poll()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+把 tag/level/包名过滤条件转换成 logcat 参数(filterspec, --pid, --uid)，在手机端先过滤一遍，
+减少经过 USB 传输和在电脑端解析的数据量。电脑端的过滤条件保持不变。
+@date:     2026/10/18
+"""
+import asyncio
+import subprocess
+from typing import List, Optional, Dict
+
+from app_info import AppInfoHelper
+from async_core import AsyncCore
+from content_filter_format import PackageFilterType
+from log_info import LogLevelHelper
+from log_print_ctr import LogPrintCtr
+
+
+class LogcatPushdown(object):
+    # 检查目标进程是否变化的间隔(秒)
+    CHECK_DELAY = 1
+
+    def __init__(self, log_printer: LogPrintCtr):
+        self._log_printer = log_printer
+        self._enable = True
+        self._pid_args: List[str] = []
+        self._restart = False
+
+    @staticmethod
+    def _is_spec_tag(tag: str) -> bool:
+        # filterspec 格式为 TAG:LEVEL，以空格分隔
+        return bool(tag) and (":" not in tag) and ("*" not in tag) and (not any(c.isspace() for c in tag))
+
+    def _filter_specs(self) -> List[str]:
+        level = self._log_printer.level.target
+        level_name = LogLevelHelper.level_name(level) if level else "V"
+        tag = self._log_printer.tag
+        specs = []
+        if tag.tag_not and (not tag.is_tag_not_fuzzy) and all(self._is_spec_tag(t) for t in tag.tag_not):
+            specs += [f"{t}:S" for t in tag.tag_not]
+        if tag.is_exact and tag.target and all(self._is_spec_tag(t) for t in tag.target):
+            specs += [f"{t}:{level_name}" for t in tag.target]
+            specs.append("*:S")
+        elif specs or level:
+            specs.append(f"*:{level_name}")
+        return self._with_process_events(specs, level)
+
+    @staticmethod
+    def _with_process_events(specs: List[str], level: int) -> List[str]:
+        """
+        进程启动/退出事件(ActivityManager I)用来更新进程表，不能被过滤掉，电脑端仍然按原条件过滤
+        """
+        am_spec = f"{AppInfoHelper.AM_TAG}:"
+        if not specs or f"{am_spec}S" in specs:
+            # 没有过滤条件，或者用户明确排除了该 tag
+            return specs
+        am_level = LogLevelHelper.INFO
+        if any(spec.startswith(am_spec) for spec in specs):
+            # 用户指定了该 tag，不能提高它的级别
+            am_level = min(level or LogLevelHelper.VERBOSE, LogLevelHelper.INFO)
+        return [f"{am_spec}{LogLevelHelper.level_name(am_level)}"] + [s for s in specs if not s.startswith(am_spec)]
+
+    def _resolve_pids(self) -> Optional[Dict[int, Optional[int]]]:
+        package = self._log_printer.package
+        if package.type != PackageFilterType.TARGET or not package.target_matcher:
+            return None
+        return AppInfoHelper.found_pids_by_name(package.target_matcher)
+
+    @staticmethod
+    def _build_pid_args(pids: Optional[Dict[int, Optional[int]]]) -> List[str]:
+        if not pids:
+            # 目标进程还没有启动(或者还没获取到进程信息)，不限制
+            return []
+        if len(pids) == 1:
+            return [f"--pid={next(iter(pids))}"]
+        uids = set(pids.values())
+        if None in uids:
+            return []
+        return ["--uid=" + ",".join(str(uid) for uid in sorted(uids))]
+
+    def build_args(self, since: Optional[str] = None) -> List[str]:
+        """
+        :param since: 重启 logcat 时，从该时间(MM-DD HH:MM:SS.mmm 或者 epoch 秒 sssss.mmm)开始输出，避免丢失日志
+        """
+        args = []
+        if since:
+            args += ["-T", since]
+        if not self._enable:
+            return args
+        self._pid_args = self._build_pid_args(self._resolve_pids())
+        # 只输出目标进程时看不到 ActivityManager 的日志
+        AppInfoHelper.set_process_events(not self._pid_args)
+        return args + self._pid_args + self._filter_specs()
+
+    def is_enable(self) -> bool:
+        return self._enable and bool(self._pid_args or self._filter_specs())
+
+    def disable(self):
+        self._enable = False
+
+    def watch(self, pro: subprocess.Popen):
+        """
+        目标进程变化时结束当前 logcat，need_restart() 返回 True
+        """
+        self._restart = False
+        if (not self._enable) or self._resolve_pids() is None:
+            return
+        AsyncCore.spawn(self._watch(pro))
+
+    async def _watch(self, pro: subprocess.Popen):
+        while pro.poll() is None:
+            await asyncio.sleep(self.CHECK_DELAY)
+            if self._build_pid_args(self._resolve_pids()) != self._pid_args:
+                self._restart = True
+                pro.kill()
+                return
+
+    def need_restart(self) -> bool:
+        return self._restart
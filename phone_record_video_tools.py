@@ -28,7 +28,8 @@ class PhoneRecordVideo(object):
         comm_tools.create_dir_not_exists(self.phone_save_path)
 
     def do_record(self):
-        code, out, err = AdbHelper().run_cmd_result_code(f"shell screenrecord {self.phone_video}")
+        # Ctrl+C 要能结束设备上的 screenrecord，不能通过 adb server socket 执行
+        code, out, err = AdbHelper().run_cmd_result_code(f"shell screenrecord {self.phone_video}", use_socket=False)
         if code == 0:
             print("do_record succeed")
         else:
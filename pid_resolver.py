@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+按需查询进程表中没有的 pid: 未知 pid 先排队，合并成一次 `adb shell ps -p` 查询
+非应用进程(内核/native)和已退出的 pid 放入带过期时间的负缓存，避免反复查询
+@date:     2026/10/18
+"""
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import color_print
+from adb_utils import AdbHelper
+from async_core import AsyncCore
+
+
+class PidResolver(object):
+    # 收到第一个未知 pid 后等待一会儿，合并同一时间段的其他 pid
+    BATCH_DELAY = 0.05
+    BATCH_MAX = 64
+    # 负缓存过期时间(秒)，pid 可能被新进程复用
+    NEGATIVE_TTL = 30
+
+    def __init__(self, on_resolved: Callable[[int, str, str], bool]):
+        """
+        :param on_resolved: (pid, name, user) -> 是否是需要的进程，False 时放入负缓存
+        """
+        self._on_resolved = on_resolved
+        self._lock = threading.Lock()
+        # 在事件循环中创建
+        self._wakeup: Optional[asyncio.Event] = None
+        # pid -> 请求时间
+        self._pending: Dict[int, float] = {}
+        # pid -> 过期时间
+        self._negative: Dict[int, float] = {}
+        self._started = False
+        self.requests = 0
+        self.negative_hits = 0
+        self.lookups = 0
+        self.resolved = 0
+        self.rejected = 0
+        self._latency = 0.0
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        AsyncCore.spawn(self._run())
+
+    def request(self, pid: int):
+        """
+        进程表中查不到 pid 时调用，不阻塞，查询结果通过 on_resolved 更新进程表
+        """
+        if not self._started:
+            return
+        expire = self._negative.get(pid)
+        if expire is not None:
+            if expire > time.monotonic():
+                self.negative_hits += 1
+                return
+            self._negative.pop(pid, None)
+        with self._lock:
+            if pid in self._pending:
+                return
+            self.requests += 1
+            self._pending[pid] = time.monotonic()
+        AsyncCore.call_soon(self._wake)
+
+    def _wake(self):
+        if self._wakeup:
+            self._wakeup.set()
+
+    def forget(self, pid: int):
+        """
+        pid 被新进程使用(进程启动事件)，不再认为是无效 pid
+        """
+        self._negative.pop(pid, None)
+
+    def _take_batch(self) -> Dict[int, float]:
+        with self._lock:
+            pids = list(self._pending.keys())[:self.BATCH_MAX]
+            batch = {pid: self._pending.pop(pid) for pid in pids}
+            if self._pending:
+                self._wakeup.set()
+            return batch
+
+    @staticmethod
+    async def _query(pids: List[int]) -> List[Tuple[int, str, str]]:
+        ret = []
+        _pids = set(pids)
+        # 所有 pid 都已退出时 ps 的退出码不为 0，不是错误
+        _cmd = "ps -o USER,PID,NAME -p " + ",".join(str(pid) for pid in pids)
+        out = await AdbHelper().shell_async(f"{_cmd} || true")
+        for line in out.splitlines():
+            ls = line.split()
+            # USER PID NAME，第一行是标题
+            if len(ls) != 3 or not ls[1].isdigit():
+                continue
+            pid = int(ls[1])
+            if pid in _pids:
+                ret.append((pid, ls[2], ls[0]))
+        return ret
+
+    async def _resolve(self, batch: Dict[int, float]):
+        self.lookups += 1
+        try:
+            found = await self._query(list(batch.keys()))
+        except Exception as e:
+            # 查询失败不能说明 pid 无效，不放入负缓存，再次出现时重新查询
+            color_print.yellow(f"resolve pid Error==>{e}")
+            return
+        now = time.monotonic()
+        for pid, name, user in found:
+            if self._on_resolved(pid, name, user):
+                self.resolved += 1
+                self._latency += now - batch.pop(pid)
+        # 已退出或者不是应用进程
+        expire = now + self.NEGATIVE_TTL
+        for pid in batch.keys():
+            self.rejected += 1
+            self._negative[pid] = expire
+
+    async def _run(self):
+        self._wakeup = asyncio.Event()
+        if self._pending:
+            self._wakeup.set()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.sleep(self.BATCH_DELAY)
+            batch = self._take_batch()
+            if batch:
+                await self._resolve(batch)
+
+    def __str__(self):
+        avg = self._latency / self.resolved * 1000 if self.resolved else 0
+        total = self.requests + self.negative_hits
+        rate = self.negative_hits * 100 / total if total else 0
+        return f"requests:{self.requests} lookups:{self.lookups} resolved:{self.resolved} " \
+               f"rejected:{self.rejected} negative_hits:{self.negative_hits}({rate:.1f}%) " \
+               f"latency:{avg:.0f}ms"
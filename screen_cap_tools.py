@@ -7,8 +7,9 @@
 import datetime
 import os.path
 
+import color_print
 import comm_tools
-from adb_utils import AdbCmd
+from adb_utils import AdbHelper
 from hdc_cmd import HdcCmd
 
 
@@ -42,10 +43,15 @@ class ScreenCapTools(object):
             os.system(f"{hdc} file recv {pic_phone_path} {pic_local_path}")
             os.system(f"{hdc} shell rm {pic_phone_path}")
         else:
-            adb = AdbCmd.find_adb()
-            os.system(f"{adb} shell screencap -p {pic_phone_path} ")
-            os.system(f"{adb} pull {pic_phone_path} {pic_local_path}")
-            os.system(f"{adb} shell rm {pic_phone_path}")
+            # 走 AdbHelper，启用 -as 时直接通过 adb server 执行
+            adb = AdbHelper()
+            for cmd in (f"shell screencap -p {pic_phone_path}",
+                        f"pull {pic_phone_path} {pic_local_path}",
+                        f"shell rm {pic_phone_path}"):
+                code, out, err = adb.run_cmd_result_code(cmd)
+                if code:
+                    color_print.red(f"{cmd} failed: {comm_tools.get_str(err or out)}")
+                    return
         print("succeed.")
         if comm_tools.is_mac_os():
             os.system(f"open {pic_local_path}")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+JsonValueFormat(-mjson) 提取 key 的结果，和原来每个 key 单独匹配时相同
+运行: python -m unittest test_content_format
+@date:     2026/10/18
+"""
+import unittest
+
+from content_format import JsonValueFormat
+
+
+def _format(keys, msg):
+    return JsonValueFormat(keys).format_content(msg)
+
+
+class JsonValueFormatTest(unittest.TestCase):
+
+    def test_single_key(self):
+        self.assertEqual("👉 'id':'7'\t", _format(["id"], '{"id":"7","name":"a"}'))
+
+    def test_key_inside_other_key(self):
+        # id 也匹配 user_id 中的 id
+        self.assertEqual("👉 'id':'x'\t'user_id':'x'\t", _format(["id", "user_id"], '{"user_id":"x"}'))
+        self.assertEqual("👉 'user_id':'x'\t'id':'x'\t", _format(["user_id", "id"], '{"user_id":"x"}'))
+
+    def test_repeated_key(self):
+        self.assertEqual("👉 'id':'['a', 'b']'\t", _format(["id"], '{"id":"a","uid":"b"}'))
+
+    def test_escaped_json(self):
+        msg = 'body={\\"user_id\\":\\"x\\",\\"id\\":\\"y\\"}'
+        self.assertEqual("👉 'id':'['x', 'y']'\t'user_id':'x'\t", _format(["id", "user_id"], msg))
+
+    def test_quote_and_separator(self):
+        self.assertEqual("👉 'a':'['1', '2', '3']'\t", _format(["a"], "a='1' a=\"2\" 'a':'3'"))
+
+    def test_no_match(self):
+        self.assertIsNone(_format(["id"], '{"name":"a"}'))
+        self.assertIsNone(_format(["id"], "id is 7"))
+
+    def test_path(self):
+        msg = '{"data":{"user":{"id":7},"items":[{"id":"a"},{"id":"b"}]}}'
+        self.assertEqual("👉 'data.user.id':'7'\t'data.items.1.id':'b'\t",
+                         _format(["data.user.id", "data.items.1.id"], msg))
+
+
+if __name__ == '__main__':
+    unittest.main()
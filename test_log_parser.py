@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+LogMsgParser.parser_head 的解析结果和原来的 PATTERN_HEAD 正则逐行对比
+运行: python -m unittest test_log_parser
+@date:     2026/10/18
+"""
+import unittest
+
+from log_parser import LogMsgParser
+
+# 正则能匹配但不是标准格式的日志头，以及看起来像日志头的内容
+_HEAD_CASES = [
+    "[ 08-28 22:39:39.974  1785: 1832 D/HeadsetStateMachine ]",
+    "[ 08-28 22:39:39.974 12345:12346 E/MyTag    ]",
+    "[ 08-28 22:39:39.974123  1785: 1832 I/ ]",
+    "[ 08-28 22:39:39.974  1785: 1832 W/a/b/c ]",
+    "[ 08-28 22:39:39/974  1785: 1832 W/tag ]",
+    "[08-2822:39:39.974 1785:1832V/tag]",
+    "[ 08-28 22:39:39 974  1785: 1832 D/tag ]",
+    "[ 08-28 22:39:39.974  1785: 1832 F/tag ]",
+    "[ 08-28 22:39:39.974  1785: 1832 D /tag ]",
+    "[ 08-28 22:39:39.974  1785 1832 D/tag ]",
+    "[ 08-28 22:39:39.  1785: 1832 D/tag ]",
+    "[ 8-28 22:39:39.974  1785: 1832 D/tag ]",
+    "[ 08-28 22:39:39.974  -1: 1832 D/tag ]",
+    "[ 08-28 22:39:39.974  ١٢: 1832 D/tag ]",
+    "[ 08-28 22:39:39.974  1785: 1832 D/tag ] ]",
+    "[ 08-28 22:39:39.974  1785: 1832 D/tag",
+    "[ ]",
+    "[]",
+    "]",
+    "[",
+    "[ key ]",
+    "{\"a\": [1, 2]}",
+    "java.lang.NullPointerException: [ 08-28 22:39:39.974  1785: 1832 D/tag ]",
+]
+
+
+def _regex(line: str):
+    match = LogMsgParser.PATTERN_HEAD.search(line)
+    if match is None:
+        return None
+    _date, _time, pid, tid, level, tag = match.groups()
+    return _date, _time, int(pid), int(tid), level, tag
+
+
+def _fields(line: str):
+    log = LogMsgParser.parser_head(line)
+    if log is None:
+        return None
+    return log.date, log.time, log.pid, log._tid, log.get_level_name(), log.tag
+
+
+class ParserHeadTest(unittest.TestCase):
+
+    def test_same_as_regex(self):
+        for line in _HEAD_CASES:
+            with self.subTest(line=line):
+                self.assertEqual(_regex(line), _fields(line))
+
+    def test_epoch(self):
+        log = LogMsgParser.parser_head("[ 1700000000.974 10123: 2311: 2320 D/HeadsetStateMachine ]")
+        self.assertEqual(1700000000974000000, log.ts_ns)
+        self.assertEqual(10123, log.uid)
+        # tag 和 PATTERN_HEAD 一样保留 "]" 前的空格
+        self.assertEqual((2311, 2320, "D", "HeadsetStateMachine "),
+                         (log.pid, log._tid, log.get_level_name(), log.tag))
+
+    def test_epoch_uid_name(self):
+        log = LogMsgParser.parser_head("[ 1700000000.000123456  root:  1: 1 I/init ]")
+        self.assertEqual(1700000000000123456, log.ts_ns)
+        self.assertEqual(0, log.uid)
+
+    def test_epoch_without_uid(self):
+        log = LogMsgParser.parser_head("[ 1700000000.974  2311: 2320 W/tag ]")
+        self.assertIsNone(log.uid)
+        self.assertEqual((2311, 2320, "W"), (log.pid, log._tid, log.get_level_name()))
+
+
+if __name__ == '__main__':
+    unittest.main()